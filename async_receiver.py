@@ -0,0 +1,285 @@
+import asyncio
+import os
+import time
+
+import metrics
+
+from capture import READ, open_capture
+from commands import COMMANDS_FILE
+from event_log import log_event
+from framer import ARG_COMMANDS, COMMANDS, LineFramer
+from link import REPLY_TIMEOUT, Link
+from receiver import BAUD_RATE, COALESCE_REPEATS, Receiver, Remote, start_services, stop_services
+from reconnect import RECONNECT_MIN_DELAY, InotifyWatcher, ReconnectManager
+from transports import SerialTransport, make_transport
+
+# Configuration
+SERIAL_PORT = os.environ.get("NEXER_PORT")  # serial path, tcp://host:port, rfcomm://address[/channel], none; unset to scan
+
+
+class FutureReply:
+    """A request waiting on the loop; the link hands it the reply or the error"""
+
+    def __init__(self, loop):
+        self.future = loop.create_future()
+
+    def set(self, value):
+        if not self.future.done():
+            self.future.set_result(value)
+
+    def fail(self, error):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class AsyncLink(Link):
+    """One open transport: frames and dispatches in the loop's reader callback"""
+
+    def __init__(self, transport, framer, on_command, watch=True, capture=None):
+        super().__init__(on_command, capture)
+        self.transport = transport
+        self.framer = framer
+        self.loop = asyncio.get_running_loop()
+        self.closed = asyncio.Event()
+        self.received_ns = 0
+        self.watching = watch  # False when something else feeds the framer, see network.py
+        if watch:
+            self.loop.add_reader(transport.fd, self.on_readable)
+
+    def send(self, data):
+        self.transport.write(data)
+
+    async def request(self, name, reply, timeout=REPLY_TIMEOUT):
+        """Send a request and wait for the matching reply's argument; raises TimeoutError or ConnectionError"""
+        waiter = FutureReply(self.loop)
+        self.expect(reply, waiter)
+        try:
+            self.write(self.encode(name))
+            return await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No reply within {timeout} s")
+        finally:
+            self.forget(reply, waiter)
+
+    def on_readable(self):
+        try:
+            received = self.framer.read_from(self.transport.fd)
+            self.received_ns = time.perf_counter_ns()
+            if self.capture and received:
+                self.capture.record(READ, self.framer.view[self.framer.end - received:self.framer.end])
+            self.process()
+        except Exception as e:
+            self.close(e)
+
+    def process(self):
+        """Dispatch every complete frame in the framer, then acknowledge them"""
+        while not self.closed.is_set():
+            frame = self.framer.next_frame()
+            if frame is None:
+                break
+            self.dispatch(frame, self.framer.seq)
+        self.flush_acks()
+
+    def close(self, error=None):
+        if self.closed.is_set():
+            return
+        self.error = error
+        self.closed.set()
+        if self.watching:
+            self.loop.remove_reader(self.transport.fd)
+        self.fail_pending(ConnectionError("Link closed"))
+        try:
+            self.transport.close()
+        except Exception:
+            pass
+
+
+class AsyncRemote(Remote):
+    """A remote served by tasks on the receiver's loop: connecting, reconnecting and keepalive"""
+
+    def __init__(self, receiver, name=None, spec=None, commands_file=COMMANDS_FILE, coalesce=True):
+        super().__init__(receiver, name, commands_file, coalesce)
+        self.spec = spec
+        self.reconnects = ReconnectManager()
+        self.woken = asyncio.Event()  # a command after idling, or a new connection
+
+    async def wait_reconnect(self):
+        """Back off before the next attempt; returns early if the device node (re)appears"""
+        delay = self.reconnects.next_delay()
+        watcher = self.reconnects.watcher
+        if not isinstance(watcher, InotifyWatcher) or self.reconnects.device_present():
+            await asyncio.sleep(delay)
+            return
+
+        loop = asyncio.get_running_loop()
+        name = os.path.basename(self.reconnects.path)
+        appeared = loop.create_future()
+
+        def on_event():
+            if name in watcher.read_names() and not appeared.done():
+                appeared.set_result(True)
+
+        self.log(f"Waiting up to {delay:.1f} s for {self.reconnects.path} to appear")
+        loop.add_reader(watcher.fd, on_event)
+        try:
+            await asyncio.wait_for(appeared, delay)
+            self.reconnects.delay = RECONNECT_MIN_DELAY
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(watcher.fd)
+
+    async def verify(self):
+        """Send initial message to check connection"""
+        try:
+            await self.link.request("PING", "PONG")
+            self.verified()
+        except (TimeoutError, ConnectionError) as e:
+            self.handshake_failed(e)
+
+    async def connection_task(self):
+        """Connect, run the link until it drops, reconnect"""
+        while True:
+            transport = make_transport(self.spec, BAUD_RATE)
+            self.log(f"Attempting to connect to {transport}")
+            try:
+                await transport.open()
+            except Exception as e:
+                self.log(f"Connection error: {str(e)}")
+                transport.close()
+                self.receiver.executor.start()
+                await self.wait_reconnect()
+                continue
+
+            if isinstance(transport, SerialTransport):
+                self.reconnects.watch(transport.path)
+            self.from_cache = getattr(transport, "cached", False)
+            framer = LineFramer(*self.registry.framer_tables(COMMANDS, ARG_COMMANDS))
+            self.link = AsyncLink(transport, framer, self.handle_command, capture=self.capture)
+            self.receiver.executor.start()
+            self.connected_via(transport)
+            await self.verify()
+
+            await self.link.closed.wait()
+            if not self.disconnected(transport):
+                await self.wait_reconnect()
+
+    async def keepalive_task(self):
+        """Ping the remote and ask for its battery level when it has been quiet; idle.py decides how often"""
+        while True:
+            # While the remote is asleep or disconnected nothing is due, and
+            # only woken ends the wait
+            try:
+                await asyncio.wait_for(self.woken.wait(), self.keepalive_wait())
+                self.woken.clear()
+                continue
+            except asyncio.TimeoutError:
+                pass
+            if not self.keepalive_start():
+                continue
+
+            link = self.link
+            try:
+                await link.request("PING", "PONG")
+                self.receiver.log_executor_stats()
+
+                # The firmware only answers one request per read, so this waits for the PONG first
+                self.battery(await link.request("BATTERY?", "BATTERY"))
+            except Exception as e:
+                self.keepalive_failed(link, e)
+
+
+class AsyncReceiver(Receiver):
+    """The receiver (see threaded_receiver.py) as cooperative tasks on one event loop instead of threads
+
+    Reading and dispatch run in the loop's reader callback for each remote's
+    transport; connecting, keepalive and the metrics endpoint are tasks. Key
+    injection stays on the CommandExecutor thread since every backend blocks.
+    """
+
+    def __init__(self, backend=None):
+        super().__init__(backend)
+        self.loop = None
+        self.stopping = None
+
+    def add_remote(self, name=None, spec=None, commands_file=COMMANDS_FILE, coalesce=COALESCE_REPEATS):
+        """Serve another remote; call before run()"""
+        remote = AsyncRemote(self, name, spec, commands_file, coalesce)
+        self.remotes.append(remote)
+        return remote
+
+    @property
+    def link(self):
+        """The first remote's link"""
+        return self.remotes[0].link if self.remotes else None
+
+    async def metrics_client(self, reader, writer):
+        """Answer one HTTP GET with the metrics"""
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+            if path in (b"/", b"/metrics"):
+                body = metrics.render().encode()
+                head = f"HTTP/1.1 200 OK\r\nContent-Type: {metrics.CONTENT_TYPE}\r\n"
+            else:
+                body = b"Not found\n"
+                head = "HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n"
+            writer.write(f"{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def metrics_task(self):
+        self.register_metrics()
+        server = await asyncio.start_server(self.metrics_client, metrics.METRICS_HOST, metrics.METRICS_PORT)
+        log_event(f"Serving metrics on http://{metrics.METRICS_HOST}:{metrics.METRICS_PORT}/metrics")
+        async with server:
+            await server.serve_forever()
+
+    def stop(self):
+        """Make run() return; callable from any thread"""
+        if self.stopping and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.stopping.set)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        tasks = []
+        for remote in self.remotes:
+            remote.capture = open_capture(remote.name if len(self.remotes) > 1 else None)
+            tasks += [asyncio.create_task(remote.connection_task()), asyncio.create_task(remote.keepalive_task())]
+        if metrics.METRICS_PORT:
+            tasks.append(asyncio.create_task(self.metrics_task()))
+
+        import network
+        if network.TCP_PORT or network.WEBSOCKET_PORT:
+            tasks.append(asyncio.create_task(network.NetworkListener(self).run()))
+        try:
+            await self.stopping.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for remote in list(self.remotes):
+                remote.close()
+
+
+def main():
+    """Run the asyncio receiver; main.py keeps the threaded one"""
+    start_services("DIY Presentation Remote Receiver")
+
+    receiver = AsyncReceiver()
+    if SERIAL_PORT != "none":  # e.g. only network remotes, see network.py
+        receiver.add_remote(spec=SERIAL_PORT)
+    try:
+        asyncio.run(receiver.run())
+    except KeyboardInterrupt:
+        log_event("Program terminated by user")
+    finally:
+        receiver.close()
+        stop_services()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Compact framed protocol, spoken instead of the text lines by remotes that
+# support it. Every frame is
+#
+#   0xA5 | type | seq | length | payload (length bytes) | CRC-8 of type..payload
+#
+# 0xA5 never starts a text line, so both protocols can share one stream and the
+# receiver switches as soon as a valid frame arrives. The remote answers the
+# receiver's text PING with a binary PONG to announce itself.
+#
+# Button frames (NEXT, PREV, SLEEP, TEXT) are numbered 0-255 and the receiver
+# acknowledges them cumulatively: ACK carries the last in-order seq, so the
+# remote can keep up to WINDOW presses in flight and resend from the first
+# unacknowledged one if an ACK does not come. Duplicates and frames after a
+# gap are dropped and re-acknowledged. PING/PONG and BATTERY?/BATTERY carry no
+# meaningful seq; BATTERY's payload is the same ASCII number as the text line.
+
+# Configuration
+SYNC = 0xA5
+HEADER_SIZE = 4  # sync, type, seq, length
+MAX_PAYLOAD = 64  # bytes
+WINDOW = 8  # sequenced frames the remote may have unacknowledged
+ACK_EVERY = WINDOW // 2  # acknowledge mid-burst at the latest after this many frames
+
+# Frame type codes
+ACK = 0x08
+TEXT = 0x09  # payload is a text-protocol line, for commands without their own code
+FRAME_TYPES = {
+    0x01: "NEXT",
+    0x02: "PREV",
+    0x03: "SLEEP",
+    0x04: "PING",
+    0x05: "PONG",
+    0x06: "BATTERY?",
+    0x07: "BATTERY",
+    ACK: "ACK",
+    TEXT: "TEXT",
+}
+FRAME_CODES = {name: code for code, name in FRAME_TYPES.items()}
+
+
+def make_crc8_table(polynomial=0x07):
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ polynomial) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+CRC8_TABLE = make_crc8_table()
+
+
+def crc8(data):
+    """CRC-8 (polynomial 0x07, init 0) of a bytes-like object"""
+    crc = 0
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode_frame(code, seq=0, payload=b""):
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"Payload of {len(payload)} bytes exceeds {MAX_PAYLOAD}")
+    body = bytes((code, seq & 0xFF, len(payload))) + payload
+    return bytes((SYNC,)) + body + bytes((crc8(body),))
+
+
+def encode_command(name, seq=0):
+    """Frame a command or request by name, falling back on a TEXT frame for names without a code"""
+    code = FRAME_CODES.get(name)
+    if code is None:
+        return encode_frame(TEXT, seq, name.encode())
+    return encode_frame(code, seq)
+
+
+class AckWindow:
+    """Receiving end of the cumulative acks: which button frames to dispatch and what to acknowledge"""
+
+    def __init__(self):
+        self.expected_seq = None  # next button frame seq; None until the first one
+        self.unacked = 0  # button frames received since the last ACK
+        self.out_of_sequence = 0  # duplicates and frames after a gap, dropped
+
+    def accept(self, seq):
+        """Note a button frame for the next ACK; False for duplicates and frames after a gap"""
+        self.unacked += 1
+        if self.expected_seq is None or seq == self.expected_seq:
+            return True
+        self.out_of_sequence += 1
+        return False
+
+    def advance(self, seq):
+        """The frame accept() let through was taken; until then the ACK does not cover it, so it is sent again"""
+        self.expected_seq = (seq + 1) & 0xFF
+
+    def take_ack(self):
+        """The ACK frame covering every in-order button frame so far, or None if nothing is owed"""
+        if not self.unacked:
+            return None
+        self.unacked = 0
+        if self.expected_seq is None:
+            return None  # the first frame was not taken yet
+        return encode_frame(ACK, self.expected_seq - 1)
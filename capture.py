@@ -0,0 +1,285 @@
+# Raw serial sessions: every byte read from and written to the remote, with
+# monotonic timestamps, appended to a compact binary file. Turned on with
+# NEXER_CAPTURE=session.nexcap; replayed into a receiver through a pty with
+#
+#   python capture.py replay session.nexcap [--speed N | --max] [-- receiver command]
+#   python capture.py dump session.nexcap
+#
+# File layout: MAGIC, then records of RECORD (kind, ns since the session
+# started, length) followed by length bytes. A START record opens every
+# session appended to the file; its data is the wall clock time as a double.
+
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from event_log import log_event
+
+# Configuration
+CAPTURE_FILE = os.environ.get("NEXER_CAPTURE")  # e.g. session.nexcap; unset to not capture
+CAPTURE_BUFFER = 64 * 1024  # bytes held in memory before they are written out
+FLUSH_INTERVAL = 1.0  # seconds; records reach the file at least this often while data flows
+SYNC_TIMEOUT = 2.0  # seconds replay waits for the receiver to answer as it did in the capture
+SETTLE_TIME = 0.5  # seconds replay keeps reading after the last record
+
+MAGIC = b"NEXCAP1\n"
+RECORD = struct.Struct("<cQH")
+MAX_RECORD = 0xFFFF  # longer data is split over several records
+
+# Record kinds
+START = b"S"
+CONNECT = b"C"  # a connection was opened; data is the port
+READ = b"R"  # bytes from the remote
+WRITE = b"W"  # bytes to the remote
+
+
+def capture_path(path, name=None):
+    """One file per remote when several are served: session.nexcap -> session.left.nexcap"""
+    if not name:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.{name}{ext}"
+
+
+class Capture:
+    """Appends every byte of a session to a capture file; safe to call from the reader and writer threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "ab", buffering=CAPTURE_BUFFER)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.start_ns = time.monotonic_ns()
+        self.flushed_ns = self.start_ns
+        self.bytes = 0
+        self.record(START, struct.pack("<d", time.time()))
+
+    def record(self, kind, data):
+        now = time.monotonic_ns()
+        with self.lock:
+            if self.file is None:
+                return
+            try:
+                offset = now - self.start_ns
+                for index in range(0, max(len(data), 1), MAX_RECORD):
+                    chunk = data[index:index + MAX_RECORD]
+                    self.file.write(RECORD.pack(kind, offset, len(chunk)))
+                    self.file.write(chunk)
+                self.bytes += len(data)
+                if now - self.flushed_ns > FLUSH_INTERVAL * 1e9:
+                    self.file.flush()
+                    self.flushed_ns = now
+            except OSError as e:
+                # A full disk must not take the link down with it
+                log_event(f"Capture stopped: {str(e)}")
+                self.file = None
+
+    def connected(self, port):
+        self.record(CONNECT, str(port).encode())
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                try:
+                    self.file.close()
+                except OSError:
+                    pass
+                self.file = None
+
+
+def open_capture(name=None):
+    """A Capture for CAPTURE_FILE, or None if capturing is off or the file cannot be opened"""
+    if not CAPTURE_FILE:
+        return None
+    path = capture_path(CAPTURE_FILE, name)
+    try:
+        capture = Capture(path)
+    except OSError as e:
+        log_event(f"Cannot capture to {path}: {str(e)}")
+        return None
+    log_event(f"Capturing raw serial traffic to {path}")
+    return capture
+
+
+def read_capture(path):
+    """(kind, ns, data) for every record, streamed so any length of capture fits in memory"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return  # end of file, or a record cut short by a crash
+            kind, ns, length = RECORD.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield kind, ns, data
+
+
+class Replay:
+    """Plays the remote's side of a capture into a receiver on a pty and checks it answers the same way
+
+    Records are sent with their captured spacing divided by speed, or back to
+    back when speed is None; either way a record is held back until the
+    receiver has written as many bytes as it had at that point of the capture,
+    so a slow receiver is measured rather than overrun.
+    """
+
+    def __init__(self, path, speed=1.0):
+        import tty  # POSIX only, and the receivers import this module for its record kinds
+
+        self.path = path
+        self.speed = speed
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # no echo or line editing before the receiver opens it
+        self.port = os.ttyname(self.slave)
+        self.records = 0
+        self.sent = 0  # bytes fed to the receiver
+        self.expected = 0  # bytes the receiver wrote in the capture
+        self.received = 0  # bytes the receiver wrote now
+        self.pending = bytearray()  # captured receiver output not yet matched
+        self.unmatched = bytearray()  # receiver output that came before the capture got that far
+        self.diverged_at = None  # offset of the first byte the receiver wrote differently
+        self.sync_timeouts = 0
+
+    def drain(self, timeout, sync=False):
+        """Read the receiver's output for timeout seconds; with sync, only until it has caught up with the capture"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if sync and self.received >= self.expected:
+                return True
+            if remaining <= 0:
+                return self.received >= self.expected
+            readable, _, _ = select.select([self.master], [], [], remaining)
+            if readable:
+                self.compare(received=os.read(self.master, 4096))
+
+    def compare(self, expected=b"", received=b""):
+        """Match the receiver's output against the capture as far as both have got"""
+        self.expected += len(expected)
+        self.received += len(received)
+        if self.diverged_at is not None:
+            return  # past the first difference only the byte counts are kept
+        self.pending += expected
+        self.unmatched += received
+        count = min(len(self.pending), len(self.unmatched))
+        if self.pending[:count] != self.unmatched[:count]:
+            index = next(i for i in range(count) if self.pending[i] != self.unmatched[i])
+            self.diverged_at = self.received - len(self.unmatched) + index
+            self.pending.clear()
+            self.unmatched.clear()
+            return
+        del self.pending[:count]
+        del self.unmatched[:count]
+
+    def run(self):
+        """Play the whole capture; returns the seconds it took"""
+        started = time.perf_counter()
+        previous_ns = None
+        sent_at = started
+        for kind, ns, data in read_capture(self.path):
+            self.records += 1
+            if kind == START:
+                previous_ns = None  # a new session: its timestamps start over
+            elif kind == WRITE:
+                self.compare(expected=data)
+            elif kind == READ:
+                if self.speed and previous_ns is not None:
+                    due = sent_at + (ns - previous_ns) / 1e9 / self.speed
+                    self.drain(max(0.0, due - time.perf_counter()))
+                if not self.drain(SYNC_TIMEOUT, sync=True):
+                    self.sync_timeouts += 1
+                os.write(self.master, data)
+                sent_at = time.perf_counter()
+                previous_ns = ns
+                self.sent += len(data)
+        elapsed = time.perf_counter() - started
+        self.drain(SETTLE_TIME)
+        return elapsed
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def capture_duration(path):
+    """Seconds of traffic in a capture, summed over its sessions"""
+    total = 0
+    last = 0
+    for kind, ns, _ in read_capture(path):
+        if kind == START:
+            total += last
+        last = ns
+    return (total + last) / 1e9
+
+
+def dump(path):
+    """Print a capture record by record"""
+    for kind, ns, data in read_capture(path):
+        if kind == START:
+            wall, = struct.unpack("<d", data)
+            print(f"--- session started {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(wall))}")
+        elif kind == CONNECT:
+            print(f"{ns / 1e9:12.6f}  connected to {data.decode(errors='replace')}")
+        else:
+            print(f"{ns / 1e9:12.6f}  {'<-' if kind == READ else '->'} {data!r}")
+
+
+def replay(path, speed, command):
+    """Start the receiver command on a pty and play the capture into it"""
+    import subprocess
+
+    session = Replay(path, speed)
+    env = dict(os.environ, NEXER_PORT=session.port)
+    env.pop("NEXER_CAPTURE", None)
+    env.setdefault("NEXER_INPUT_BACKEND", "null")  # a replay should not press keys on this machine
+    print(f"Replaying {path} on {session.port} at {f'{speed:g}x' if speed else 'full'} speed")
+    receiver = subprocess.Popen(command, env=env)
+    try:
+        elapsed = session.run()
+    finally:
+        receiver.terminate()
+        receiver.wait(5)
+        session.close()
+
+    print(f"{session.records} records, {session.sent} bytes sent in {elapsed:.2f} s "
+          f"(captured: {capture_duration(path):.2f} s)")
+    print(f"Receiver wrote {session.received} of {session.expected} captured bytes, "
+          f"{session.sync_timeouts} sync timeouts")
+    if session.diverged_at is None:
+        print("Output matches the capture")
+    else:
+        print(f"Output differs from the capture from byte {session.diverged_at}")
+    return session.diverged_at is None and not session.sync_timeouts
+
+
+def main():
+    args = sys.argv[1:]
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "async_receiver.py")]
+    if "--" in args:
+        command = args[args.index("--") + 1:]
+        args = args[:args.index("--")]
+    if len(args) < 2 or args[0] not in ("replay", "dump"):
+        print("usage: capture.py replay FILE [--speed N | --max] [-- receiver command]")
+        print("       capture.py dump FILE")
+        return 2
+
+    if args[0] == "dump":
+        dump(args[1])
+        return 0
+    speed = 1.0
+    if "--max" in args:
+        speed = None
+    elif "--speed" in args:
+        speed = float(args[args.index("--speed") + 1])
+    return 0 if replay(args[1], speed, command) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
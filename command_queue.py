@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+
+import latency
+
+# Configuration
+COMMAND_QUEUE_SIZE = 32  # pending actions; further presses are refused (and not acked) while full
+
+
+class CommandExecutor:
+    """Runs actions on a worker thread so the serial reader never waits on key injection"""
+
+    def __init__(self, handler, maxsize=COMMAND_QUEUE_SIZE, setup=None):
+        self.handler = handler
+        self.setup = setup  # run on the worker thread before the first action, e.g. to load a backend
+        self.queue = queue.Queue(maxsize)
+        self.thread = None
+
+        # Each counter is only ever written by one thread: submitted/dropped by
+        # the reader, the rest by the worker
+        self.submitted = 0
+        self.dropped = 0
+        self.executed = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.queue_wait_ns = 0
+        self.execute_ns = 0
+
+    def start(self):
+        if self.thread:
+            return
+        self.thread = threading.Thread(target=self.run, name="executor", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        """Let queued actions finish, then stop the worker"""
+        if self.thread:
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self.thread.join(timeout)
+            self.thread = None
+
+    def submit(self, action):
+        """Queue an action without blocking; False if the queue is full"""
+        try:
+            self.queue.put_nowait((action, time.perf_counter_ns()))
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        self.submitted += 1
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    def run(self):
+        if self.setup:
+            self.setup()
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            action, queued_at = item
+            started = time.perf_counter_ns()
+            try:
+                self.handler(action)
+            except Exception:
+                self.errors += 1
+            finished = time.perf_counter_ns()
+            latency.record("queue", queued_at, started)
+            latency.record("press", started, finished)
+
+            self.executed += 1
+            self.queue_wait_ns += started - queued_at
+            self.execute_ns += finished - started
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        """Counters plus average queue wait and execution time in milliseconds"""
+        executed = self.executed or 1
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "executed": self.executed,
+            "errors": self.errors,
+            "avg_queue_wait_ms": self.queue_wait_ns / executed / 1e6,
+            "avg_execute_ms": self.execute_ns / executed / 1e6,
+        }
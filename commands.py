@@ -0,0 +1,67 @@
+import os
+
+# Configuration
+COMMANDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands.json")  # optional, see commands.example.json
+
+# Argument types a command can declare, parsed from the text after "NAME:"
+ARG_PARSERS = {
+    "int": int,
+    "float": float,
+    "str": str,
+}
+
+
+class Command:
+    """One command token: its handler, ack policy and optional argument type"""
+
+    def __init__(self, name, handler, ack=False, arg=None):
+        self.name = name
+        self.handler = handler  # called with the parsed argument (or None); returns True if accepted, raises ValueError to refuse it
+        self.ack = ack  # send OK back once the handler accepted the command
+        self.arg = arg
+        self.parse = ARG_PARSERS[arg] if arg else None
+
+
+class CommandRegistry:
+    """Maps command tokens to Commands for a single dict lookup per received line"""
+
+    def __init__(self):
+        self.commands = {}
+
+    def register(self, command):
+        self.commands[command.name] = command
+
+    def get(self, name):
+        return self.commands.get(name)
+
+    def framer_tables(self, exact=(), prefixed=()):
+        """Byte tables for LineFramer: exact tokens and "NAME:" prefixes, on top of the given ones"""
+        exact = dict(exact)
+        prefixed = dict(prefixed)
+        for name, command in self.commands.items():
+            if command.parse:
+                prefixed[f"{name}:".encode()] = name
+            else:
+                exact[name.encode()] = name
+        return exact, prefixed
+
+    def load(self, path, actions):
+        """Register the commands declared in a JSON file
+
+        Each entry maps a token to {"action": ..., "ack": bool, "arg": type, ...};
+        the action names a factory in actions that turns the entry into a handler.
+        """
+        import json
+
+        with open(path) as config_file:
+            config = json.load(config_file)
+
+        for name, spec in config.items():
+            factory = actions.get(spec.get("action"))
+            if factory is None:
+                raise ValueError(f"Command {name}: unknown action {spec.get('action')!r}")
+            arg = spec.get("arg")
+            if arg and arg not in ARG_PARSERS:
+                raise ValueError(f"Command {name}: unknown argument type {arg!r}")
+            self.register(Command(name, factory(spec), ack=spec.get("ack", False), arg=arg))
+        return len(config)
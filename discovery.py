@@ -0,0 +1,166 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import serial
+
+from event_log import log_event
+from serial_reader import LineReader
+
+# Configuration
+DEVICE_NAME = "DIY_Presentation_Remote"
+PROBE_TIMEOUT = 3.0  # seconds per port; the firmware answers PING about 1 s late
+MAX_PROBES = 8  # ports probed at the same time
+IGNORED_PORTS = ("debug-console", "Bluetooth-Incoming-Port")  # never worth a PING
+CACHE_FILE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                          "nexer-presentation-remote", "last_port.json")
+
+# Global variables
+claim_lock = threading.Lock()  # only one probe may win
+
+
+def port_fingerprints():
+    """Device path -> description/hwid string for every port the OS lists"""
+    from serial.tools import list_ports
+
+    return {info.device: f"{info.description}|{info.hwid}" for info in list_ports.comports()}
+
+
+def candidate_ports(fingerprints):
+    """Ports worth probing, most likely first"""
+    ports = set(glob.glob("/dev/cu.*") + glob.glob("/dev/tty.*") + glob.glob("/dev/rfcomm*")) | set(fingerprints)
+    ports = [port for port in ports if not any(ignored in port for ignored in IGNORED_PORTS)]
+
+    def rank(port):
+        text = f"{port} {fingerprints.get(port, '')}".lower()
+        if DEVICE_NAME.lower() in text:
+            return 0
+        if "bluetooth" in text or "rfcomm" in text:
+            return 1
+        return 2
+
+    return sorted(ports, key=lambda port: (rank(port), port))
+
+
+def load_cache():
+    try:
+        with open(CACHE_FILE) as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def remember_port(port, fingerprints=None):
+    """Store the port that answered, with its fingerprint, for the next startup"""
+    if fingerprints is None:
+        fingerprints = port_fingerprints()
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(CACHE_FILE, "w") as cache_file:
+            json.dump({"port": port, "fingerprint": fingerprints.get(port), "saved": time.time()}, cache_file)
+    except OSError as e:
+        log_event(f"Cannot save last known port: {str(e)}")
+
+
+def forget_port():
+    try:
+        os.remove(CACHE_FILE)
+    except OSError:
+        pass
+
+
+def cached_port(fingerprints):
+    """The last known good port, if it is still there and still the same device"""
+    cache = load_cache()
+    if not cache or not os.path.exists(cache["port"]):
+        return None
+    if cache.get("fingerprint") and fingerprints.get(cache["port"]) not in (None, cache["fingerprint"]):
+        log_event(f"{cache['port']} is a different device now, rescanning")
+        return None
+    return cache["port"]
+
+
+def probe(port, baud_rate, found, results):
+    """Open a port and PING it; puts (port, open handle) on results if it answers PONG"""
+    try:
+        handle = serial.Serial(port, baud_rate, timeout=PROBE_TIMEOUT)
+    except Exception as e:
+        log_event(f"Cannot open {port}: {str(e)}")
+        return
+
+    try:
+        if found.is_set():
+            handle.close()
+            return
+        handle.write(b"PING\n")
+        reader = LineReader(handle, timeout=0.25)
+        deadline = time.monotonic() + PROBE_TIMEOUT
+        while time.monotonic() < deadline and not found.is_set():
+            frame = reader.read_frame()
+            if frame and frame[0] == "PONG":
+                with claim_lock:
+                    if not found.is_set():
+                        found.set()
+                        results.put((port, handle))
+                        return
+                break
+    except Exception as e:
+        log_event(f"Probe of {port} failed: {str(e)}")
+    handle.close()
+
+
+def discover(baud_rate, fingerprints):
+    """Probe candidate ports in parallel; (port, open handle) of the first to answer, or (None, None)"""
+    candidates = candidate_ports(fingerprints)
+    if not candidates:
+        return None, None
+    log_event(f"Probing {len(candidates)} ports: {', '.join(candidates)}")
+
+    found = threading.Event()
+    results = queue.Queue()
+    pending = queue.Queue()
+    for port in candidates:
+        pending.put(port)
+
+    def worker():
+        while not found.is_set():
+            try:
+                port = pending.get_nowait()
+            except queue.Empty:
+                return
+            probe(port, baud_rate, found, results)
+
+    workers = [threading.Thread(target=worker, name="port-probe", daemon=True)
+               for _ in range(min(MAX_PROBES, len(candidates)))]
+    for thread in workers:
+        thread.start()
+
+    def all_done():
+        for thread in workers:
+            thread.join()
+        results.put((None, None))
+
+    # Return on the first PONG; the remaining probes notice found and close their ports
+    threading.Thread(target=all_done, daemon=True).start()
+    return results.get()
+
+
+def find_esp32_port(baud_rate):
+    """The ESP32's port: the cached one if it is still valid, otherwise the first to answer a parallel probe
+
+    Returns (port, handle); handle is an already open Serial when the port came from a probe.
+    """
+    fingerprints = port_fingerprints()
+    port = cached_port(fingerprints)
+    if port:
+        log_event(f"Trying last known port {port}")
+        return port, None
+
+    port, handle = discover(baud_rate, fingerprints)
+    if port:
+        log_event(f"Found ESP32 at {port}")
+        remember_port(port, fingerprints)
+    return port, handle
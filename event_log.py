@@ -0,0 +1,149 @@
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Same values as the logging module's levels, without importing it
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+# Configuration
+LOG_FILE = "presentation_remote.log"  # None to only log to stdout
+LOG_CONSOLE = True  # also write to stdout
+LOG_LEVEL = INFO  # records below this are dropped before any formatting
+LOG_MAX_BYTES = 1_000_000  # rotate once the file would grow past this
+LOG_BACKUPS = 3  # presentation_remote.log.1 ... .3
+LOG_ROTATE_SECONDS = None  # also rotate after this many seconds, e.g. 24 * 3600
+LOG_BATCH = 256  # records written per flush at most
+
+__all__ = ["DEBUG", "INFO", "WARNING", "ERROR", "log_event", "start_logging", "stop_logging"]
+
+# Global variables
+threshold = LOG_LEVEL
+records = queue.SimpleQueue()
+writer = None
+
+
+def log_event(message, *args, level=INFO):
+    """Queue an event for the log writer; args are %-formatted on the writer thread"""
+    if level < threshold:
+        return
+    if writer is None:
+        # Logging not started (benchmarks, one-off scripts): write straight away
+        print(format_record(time.time(), message, args))
+        return
+    records.put((time.time(), message, args))
+
+
+def format_record(timestamp, message, args):
+    if args:
+        message = message % args
+    return f"[{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+
+
+class LogWriter:
+    """Background thread that writes queued records in batches to stdout and a rotating file"""
+
+    def __init__(self, path, console=True, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+                 rotate_seconds=LOG_ROTATE_SECONDS, batch=LOG_BATCH):
+        self.path = path
+        self.console = console
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotate_seconds = rotate_seconds
+        self.batch = batch
+        self.file = None
+        self.opened_at = 0
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+
+    def open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_at = time.time()
+
+    def rotate(self):
+        """presentation_remote.log -> .1 -> .2 ..., dropping the oldest"""
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.open()
+
+    def write_console(self, text):
+        # pythonw and receivers started at login have no stdout at all
+        if self.console and sys.stdout is not None:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def write_file(self, text):
+        if self.path:
+            if self.file is None:
+                self.open()
+            size = self.file.tell()
+            too_big = self.max_bytes and size and size + len(text) > self.max_bytes
+            too_old = self.rotate_seconds and time.time() - self.opened_at >= self.rotate_seconds
+            if too_big or too_old:
+                self.rotate()
+            self.file.write(text)
+            self.file.flush()
+
+    def run(self):
+        while True:
+            # Block for the first record, then take whatever else is already queued
+            batch = [records.get()]
+            while len(batch) < self.batch:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            lines = []
+            for record in batch:
+                if record is None:
+                    continue
+                try:
+                    lines.append(format_record(*record))
+                except Exception as e:
+                    # One bad format string or argument costs its own line, not the batch
+                    lines.append(format_record(record[0], f"Unformattable log record {record[1]!r}: {str(e)}", ()))
+            if lines:
+                # Either output failing must not cost the other its lines
+                text = "\n".join(lines) + "\n"
+                for write in (self.write_console, self.write_file):
+                    try:
+                        write(text)
+                    except Exception as e:
+                        print(f"Log writer error: {str(e)}", file=sys.stderr)
+            if stop:
+                if self.file:
+                    self.file.close()
+                return
+
+
+def start_logging(path=None, log_level=None, console=None):
+    """Start the background log writer; unset arguments come from the LOG_* settings"""
+    global writer, threshold
+    threshold = LOG_LEVEL if log_level is None else log_level
+    if writer is None:
+        writer = LogWriter(LOG_FILE if path is None else path, LOG_CONSOLE if console is None else console)
+        writer.thread.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Write out everything still queued and stop the writer"""
+    global writer
+    if writer is not None:
+        records.put(None)
+        writer.thread.join(5)
+        writer = None
@@ -0,0 +1,175 @@
+import os
+
+from binary_protocol import FRAME_TYPES, HEADER_SIZE, MAX_PAYLOAD, SYNC, TEXT, crc8
+
+# Configuration
+BUFFER_SIZE = 4096  # bytes
+MAX_LINE = 80  # bytes; a longer run without a newline is line noise and gets dropped
+TRIM = frozenset(b" \t\r\x00")  # println() adds \r\n, a waking radio sometimes adds NULs
+SYNC_BYTE = bytes((SYNC,))
+
+# Known lines mapped to the command names handed out for them
+COMMANDS = {
+    b"NEXT": "NEXT",
+    b"PREV": "PREV",
+    b"SLEEP": "SLEEP",
+    b"PONG": "PONG",
+}
+
+# Prefixes of lines that carry an argument, e.g. BATTERY:87.5
+ARG_COMMANDS = {
+    b"BATTERY:": "BATTERY",
+}
+
+
+class LineFramer:
+    """Splits a byte stream into (command, arg) frames without decoding known commands
+
+    Binary protocol frames (see binary_protocol.py) are recognised by their
+    sync byte wherever a line could start; seq is set for them and None for lines.
+    """
+
+    def __init__(self, commands=COMMANDS, arg_commands=ARG_COMMANDS, size=BUFFER_SIZE, max_line=MAX_LINE):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # first byte not yet framed
+        self.end = 0  # one past the last byte received
+        self.max_line = max_line
+        self.discarding = False
+        self.noise = 0  # bytes dropped while resyncing
+        self.crc_errors = 0
+        self.seq = None  # sequence number of the last frame if it was binary
+
+        # Exact matches are bucketed by length so a line is only compared
+        # against commands it could possibly be
+        self.by_length = {}
+        for raw, command in commands.items():
+            self.by_length.setdefault(len(raw), []).append((raw, command))
+        self.arg_commands = list(arg_commands.items())
+
+    def space(self):
+        """Writable view over the free tail of the buffer, moving a partial line to the front if needed"""
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buffer):
+            partial = bytes(self.view[self.start:self.end])
+            self.buffer[:len(partial)] = partial
+            self.start, self.end = 0, len(partial)
+        return self.view[self.end:]
+
+    def read_from(self, fd):
+        """Read whatever the fd has straight into the buffer"""
+        try:
+            received = os.readv(fd, [self.space()])
+        except BlockingIOError:
+            return 0
+        if not received:
+            raise ConnectionError("Device reported readiness to read but returned no data")
+        self.end += received
+        return received
+
+    def feed(self, data):
+        """Copy as much of data as fits into the buffer; returns the number of bytes taken"""
+        space = self.space()
+        count = min(len(space), len(data))
+        space[:count] = data[:count]
+        self.end += count
+        return count
+
+    def drop_pending(self):
+        """Throw away a partial line that has grown past max_line"""
+        self.noise += self.end - self.start
+        self.start = self.end
+        self.discarding = True
+
+    def next_binary(self):
+        """The binary frame at start, None until it is complete, or False if the sync byte was noise"""
+        buffer = self.buffer
+        start = self.start
+        if self.end - start < HEADER_SIZE:
+            return None
+        code, seq, length = buffer[start + 1], buffer[start + 2], buffer[start + 3]
+        if code not in FRAME_TYPES or length > MAX_PAYLOAD:
+            self.start += 1
+            self.noise += 1
+            return False
+
+        payload = start + HEADER_SIZE
+        last = payload + length
+        if self.end <= last:
+            return None
+        if crc8(self.view[start + 1:last]) != buffer[last]:
+            self.start += 1
+            self.noise += 1
+            self.crc_errors += 1
+            return False
+
+        self.start = last + 1
+        self.seq = seq
+        if code == TEXT:
+            return self.match(payload, last)
+        return FRAME_TYPES[code], buffer[payload:last].decode('utf-8', errors='replace') if length else None
+
+    def match(self, first, last):
+        """The (command, arg) frame for the line in buffer[first:last]"""
+        buffer = self.buffer
+        candidates = self.by_length.get(last - first)
+        if candidates:
+            for raw, command in candidates:
+                if buffer.startswith(raw, first):
+                    return command, None
+
+        for prefix, command in self.arg_commands:
+            if buffer.startswith(prefix, first, last):
+                return command, buffer[first + len(prefix):last].decode('utf-8', errors='replace')
+
+        # Unknown lines are rare enough to decode
+        return buffer[first:last].decode('utf-8', errors='replace'), None
+
+    def next_frame(self):
+        """The next (command, arg) frame, or None until another full line or binary frame arrives"""
+        buffer = self.buffer
+        while True:
+            if self.start < self.end and buffer[self.start] == SYNC:
+                frame = self.next_binary()
+                if frame is False:
+                    continue
+                return frame
+
+            newline = buffer.find(b"\n", self.start, self.end)
+
+            # Lines never contain the sync byte, so anything before one is
+            # the remains of a damaged binary frame
+            sync = buffer.find(SYNC_BYTE, self.start, self.end if newline < 0 else newline)
+            if sync >= 0:
+                self.noise += sync - self.start
+                self.start = sync
+                self.discarding = False
+                continue
+
+            if newline < 0:
+                if self.end - self.start > self.max_line:
+                    self.drop_pending()
+                return None
+
+            first, last = self.start, newline
+            self.start = newline + 1
+            if self.discarding:
+                # Tail of an overlong line; the next one starts clean
+                self.noise += last - first + 1
+                self.discarding = False
+                continue
+
+            # Fast path for a plain CRLF ending, full trim only when needed
+            if last > first and buffer[last - 1] == 13:
+                last -= 1
+            if first < last and (buffer[first] in TRIM or buffer[last - 1] in TRIM):
+                while first < last and buffer[last - 1] in TRIM:
+                    last -= 1
+                while first < last and buffer[first] in TRIM:
+                    first += 1
+            if first == last:
+                continue
+
+            self.seq = None
+            return self.match(first, last)
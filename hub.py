@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+import time
+
+from async_receiver import COALESCE_REPEATS, AsyncReceiver
+from commands import COMMANDS_FILE
+from event_log import log_event
+from receiver import start_services, stop_services
+
+# Configuration
+REMOTES_FILE = os.environ.get("NEXER_REMOTES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "remotes.json"))
+FLOOR_TIMEOUT = 60  # seconds a presenter keeps the floor after its last press
+ROLES = ("presenter", "moderator")
+
+
+class Hub(AsyncReceiver):
+    """Any number of remotes on one event loop and one key backend
+
+    Moderator remotes always drive the slides. Among presenters only the one
+    holding the floor does: the first to press takes it and keeps it until it
+    has been idle for FLOOR_TIMEOUT or disconnects. Refused presses are still
+    acknowledged so the remote does not stall.
+    """
+
+    def __init__(self, backend=None, arbitration=True):
+        super().__init__(backend)
+        self.arbitration = arbitration
+        self.roles = {}
+        self.floor = None
+
+    def add_remote(self, name=None, spec=None, commands_file=COMMANDS_FILE, coalesce=COALESCE_REPEATS,
+                   role="presenter"):
+        if role not in ROLES:
+            raise ValueError(f"Unknown role '{role}' for remote {name}, expected one of {', '.join(ROLES)}")
+        remote = super().add_remote(name, spec, commands_file, coalesce)
+        remote.last_press = 0.0
+        self.roles[remote] = role
+        return remote
+
+    def allow(self, remote):
+        # Network clients (network.py) take part as presenters
+        if not self.arbitration or self.roles.get(remote, "presenter") == "moderator":
+            return True
+
+        now = time.monotonic()
+        holder = self.floor
+        if holder is not remote:
+            if holder and holder.connected and now - holder.last_press < FLOOR_TIMEOUT:
+                return False
+            self.floor = remote
+            remote.log("Has the floor")
+        remote.last_press = now
+        return True
+
+    def add_remotes(self, path):
+        """Add the remotes listed in a JSON file; returns how many"""
+        with open(path) as f:
+            entries = json.load(f)
+
+        base = os.path.dirname(os.path.abspath(path))
+        for index, entry in enumerate(entries):
+            name = entry.get("name") or f"remote-{index + 1}"
+            if not entry.get("port"):
+                raise ValueError(f"Remote {name} needs a port; the hub does not scan for remotes")
+            commands_file = entry.get("commands", COMMANDS_FILE)
+            if commands_file:
+                commands_file = os.path.join(base, commands_file)
+            self.add_remote(name, entry["port"], commands_file, entry.get("coalesce", COALESCE_REPEATS),
+                            entry.get("role", "presenter"))
+        return len(entries)
+
+
+def main():
+    """Serve every remote in remotes.json from one process"""
+    start_services("DIY Presentation Remote Hub")
+
+    hub = Hub()
+    try:
+        count = hub.add_remotes(REMOTES_FILE)
+        log_event(f"Serving {count} remotes from {REMOTES_FILE}")
+        asyncio.run(hub.run())
+    except (OSError, ValueError) as e:
+        log_event(f"Cannot load remotes: {str(e)}")
+    except KeyboardInterrupt:
+        log_event("Program terminated by user")
+    finally:
+        hub.close()
+        stop_services()
+
+if __name__ == "__main__":
+    main()
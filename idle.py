@@ -0,0 +1,62 @@
+import time
+
+# Configuration
+IDLE_AFTER = 60  # seconds without commands before keepalive pings start stretching out
+SLEEP_AFTER = 330  # seconds without commands after which the remote is taken to be asleep (firmware INACTIVITY_TIMEOUT is 300)
+IDLE_KEEPALIVE_MAX = 600  # seconds; ceiling for the stretched keepalive interval
+
+# States
+ACTIVE = "active"
+IDLE = "idle"
+ASLEEP = "asleep"
+
+
+class IdleState:
+    """Whether anyone is presenting, and so how often the remote needs pinging
+
+    ACTIVE pings every keepalive interval. IDLE doubles the interval after
+    each ping up to IDLE_KEEPALIVE_MAX. ASLEEP (after SLEEP, or SLEEP_AFTER
+    without commands) does not ping at all: the firmware is in deep sleep and
+    the receiver has no timer left, only the port and the device node to wake it.
+    Any command makes it ACTIVE again.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.last_activity = time.monotonic()
+        self.sleeping = False  # SLEEP received
+        self.idle_pings = 0
+
+    def state(self, now=None):
+        quiet = (now or time.monotonic()) - self.last_activity
+        if self.sleeping or quiet >= SLEEP_AFTER:
+            return ASLEEP
+        if quiet >= IDLE_AFTER:
+            return IDLE
+        return ACTIVE
+
+    def activity(self):
+        """A command came in; True if that woke the receiver from IDLE or ASLEEP"""
+        woke = self.state() != ACTIVE
+        self.last_activity = time.monotonic()
+        self.sleeping = False
+        self.idle_pings = 0
+        return woke
+
+    def sleep(self):
+        self.sleeping = True
+
+    def keepalive_due(self, last_keepalive):
+        """Monotonic time the next keepalive is due, or None while asleep"""
+        now = time.monotonic()
+        state = self.state(now)
+        if state == ASLEEP:
+            return None
+        interval = self.interval
+        if state == IDLE:
+            interval = min(self.interval * 2 ** self.idle_pings, IDLE_KEEPALIVE_MAX)
+        return max(self.last_activity, last_keepalive) + interval
+
+    def keepalive_sent(self):
+        if self.state() == IDLE:
+            self.idle_pings += 1
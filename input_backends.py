@@ -0,0 +1,378 @@
+import json
+import os
+import sys
+import time
+
+# Configuration
+PYAUTOGUI_PAUSE = 0.0  # seconds, pyautogui sleeps this long after every call (its default is 0.1)
+AUTO_ORDER = ["uinput", "xtest", "xdotool", "pyautogui"]  # tried in order by get_backend("auto")
+IMPRESS_UNO_URL = os.environ.get("NEXER_IMPRESS_UNO",
+                                 "uno:socket,host=localhost,port=2002;urp;StarOffice.ComponentContext")  # soffice --accept="socket,host=localhost,port=2002;urp;"
+SLIDE_URL = os.environ.get("NEXER_SLIDE_URL", "http://127.0.0.1:8790")  # control port of an HTML/PDF viewer, see HttpSlideBackend
+SLIDE_TIMEOUT = 2.0  # seconds per control request
+MAX_PRESSES = 200  # most key presses one SKIP:n or GOTO:n turns into, so a bad count cannot hold up the executor
+
+# Pseudo key for jumping to a slide; its count is the 1-based slide number
+GOTO = "goto"
+
+# Keys that move one slide, and which way
+SLIDE_STEPS = {"right": 1, "down": 1, "pagedown": 1, "space": 1, "left": -1, "up": -1, "pageup": -1}
+
+# pyautogui key names mapped to X11 keysym names
+X_KEYSYMS = {
+    "right": "Right", "left": "Left", "up": "Up", "down": "Down",
+    "home": "Home", "end": "End", "pageup": "Prior", "pagedown": "Next",
+    "space": "space", "shift": "Shift_L",
+}
+
+
+class KeyBackend:
+    """Injects key presses into the focused window"""
+
+    name = "base"
+    slide = None  # the slide on screen (1-based) as of the last exchange with the app; None if unknown
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def press_times(self, key, count):
+        for _ in range(min(count, MAX_PRESSES)):
+            self.press(key)
+
+    def goto(self, slide):
+        """Show slide (1-based); with keystrokes that means the first slide, then right arrows"""
+        self.press("home")
+        self.press_times("right", slide - 1)
+
+    def current(self):
+        """The slide on screen (1-based) as last seen, or None if the backend cannot tell; never waits on the app"""
+        return self.slide
+
+    def close(self):
+        pass
+
+
+class UinputBackend(KeyBackend):
+    """Linux virtual keyboard via python-evdev, kept open for the lifetime of the receiver"""
+
+    name = "uinput"
+
+    def __init__(self):
+        from evdev import UInput, ecodes
+
+        self.ecodes = ecodes
+        self.keycodes = {
+            "right": ecodes.KEY_RIGHT,
+            "left": ecodes.KEY_LEFT,
+            "up": ecodes.KEY_UP,
+            "down": ecodes.KEY_DOWN,
+            "home": ecodes.KEY_HOME,
+            "end": ecodes.KEY_END,
+            "pageup": ecodes.KEY_PAGEUP,
+            "pagedown": ecodes.KEY_PAGEDOWN,
+            "space": ecodes.KEY_SPACE,
+            "shift": ecodes.KEY_LEFTSHIFT,
+        }
+        self.device = UInput({ecodes.EV_KEY: list(self.keycodes.values())}, name="nexer-presentation-remote")
+
+    def press(self, key):
+        code = self.keycodes[key]
+        self.device.write(self.ecodes.EV_KEY, code, 1)
+        self.device.write(self.ecodes.EV_KEY, code, 0)
+        self.device.syn()
+
+    def close(self):
+        self.device.close()
+
+
+class XTestBackend(KeyBackend):
+    """X11 XTest extension via python-xlib over a single persistent display connection"""
+
+    name = "xtest"
+
+    def __init__(self):
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+
+        self.X = X
+        self.xtest = xtest
+        self.display = display.Display()
+        if not self.display.has_extension("XTEST"):
+            raise RuntimeError("X server has no XTEST extension")
+
+        self.keycodes = {key: self.display.keysym_to_keycode(XK.string_to_keysym(sym))
+                         for key, sym in X_KEYSYMS.items()}
+
+    def press(self, key):
+        code = self.keycodes[key]
+        self.xtest.fake_input(self.display, self.X.KeyPress, code)
+        self.xtest.fake_input(self.display, self.X.KeyRelease, code)
+        self.display.sync()
+
+    def close(self):
+        self.display.close()
+
+
+class XdotoolBackend(KeyBackend):
+    """Shells out to xdotool, for X11 setups without python-xlib"""
+
+    name = "xdotool"
+
+    def __init__(self):
+        import shutil
+        import subprocess
+
+        self.subprocess = subprocess
+        self.xdotool = shutil.which("xdotool")
+        if not self.xdotool:
+            raise RuntimeError("xdotool not found on PATH")
+
+    def press(self, key):
+        self.subprocess.run([self.xdotool, "key", X_KEYSYMS[key]], check=True)
+
+
+class PyAutoGUIBackend(KeyBackend):
+    """The original pyautogui path, with its per-call PAUSE turned down"""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+
+        pyautogui.PAUSE = PYAUTOGUI_PAUSE
+        self.pyautogui = pyautogui
+
+    def press(self, key):
+        self.pyautogui.press(key)
+
+
+class NullBackend(KeyBackend):
+    """Drops every key press"""
+
+    name = "null"
+
+    def press(self, key):
+        pass
+
+
+class RecordingBackend(KeyBackend):
+    """Remembers every key press with its perf_counter timestamp instead of injecting it"""
+
+    name = "recording"
+
+    def __init__(self):
+        self.presses = []
+
+    def press(self, key):
+        self.presses.append((key, time.perf_counter()))
+
+
+class SlideBackend(KeyBackend):
+    """Drives the presentation app itself over a control channel instead of pressing keys
+
+    Works whatever window has focus, and jumps (GOTO:n, a repeated NEXT)
+    cost one request however many slides they skip. Subclasses implement
+    next/previous (which step through animations like the arrow keys do),
+    show(index) and position() with 0-based slide indices, and keep slide
+    up to date as they go.
+    """
+
+    def press(self, key):
+        self.press_times(key, 1)
+
+    def press_times(self, key, count):
+        if key == "home":
+            self.show(0)
+        elif key == "end":
+            self.show(self.count() - 1)
+        elif key not in SLIDE_STEPS:
+            raise ValueError(f"{self.name} backend cannot press {key!r}")
+        elif count == 1:
+            self.next() if SLIDE_STEPS[key] > 0 else self.previous()
+        else:
+            index, slides = self.position()
+            self.show(min(max(index + SLIDE_STEPS[key] * count, 0), slides - 1))
+
+    def goto(self, slide):
+        self.show(min(max(slide, 1), self.count()) - 1)
+
+    def next(self):
+        raise NotImplementedError
+
+    def previous(self):
+        raise NotImplementedError
+
+    def show(self, index):
+        raise NotImplementedError
+
+    def position(self):
+        """(current slide index, number of slides), asked of the app"""
+        raise NotImplementedError
+
+    def count(self):
+        return self.position()[1]
+
+
+class ImpressBackend(SlideBackend):
+    """LibreOffice Impress over its UNO socket; the slideshow must be running"""
+
+    name = "impress"
+
+    def __init__(self, url=None):
+        import uno
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        context = resolver.resolve(url or IMPRESS_UNO_URL)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        self.slideshow = None
+        self.controller()
+
+    def controller(self):
+        """The running slideshow's XSlideShowController, found again if the show was restarted"""
+        if self.slideshow is None or not self.slideshow.isRunning():
+            document = self.desktop.getCurrentComponent()
+            slideshow = document.getPresentation().getController() if document else None
+            if slideshow is None:
+                raise RuntimeError("No Impress slideshow running")
+            self.slideshow = slideshow
+        return self.slideshow
+
+    def next(self):
+        self.controller().gotoNextEffect()
+        self.position()  # an effect may or may not have moved to the next slide
+
+    def previous(self):
+        self.controller().gotoPreviousEffect()
+        self.position()
+
+    def show(self, index):
+        self.controller().gotoSlideIndex(index)
+        self.slide = index + 1
+
+    def position(self):
+        slideshow = self.controller()
+        index = slideshow.getCurrentSlideIndex()
+        self.slide = index + 1
+        return index, slideshow.getSlideCount()
+
+
+class OkularBackend(SlideBackend):
+    """Okular (PDF) over D-Bus via dbus-python; its page numbers are 1-based"""
+
+    name = "okular"
+
+    def __init__(self):
+        import dbus
+
+        bus = dbus.SessionBus()
+        services = [name for name in bus.list_names() if name.startswith("org.kde.okular")]
+        if not services:
+            raise RuntimeError("No Okular instance on the session bus")
+        self.okular = dbus.Interface(bus.get_object(services[0], "/okular"), "org.kde.okular")
+
+    def next(self):
+        self.okular.slotNextPage()
+        self.position()  # no move past the last page
+
+    def previous(self):
+        self.okular.slotPreviousPage()
+        self.position()
+
+    def show(self, index):
+        self.okular.goToPage(index + 1)
+        self.slide = index + 1
+
+    def position(self):
+        self.slide = int(self.okular.currentPage())
+        return self.slide - 1, int(self.okular.pages())
+
+
+class HttpSlideBackend(SlideBackend):
+    """A viewer's local HTTP control port, over one keep-alive connection
+
+    POST /next, /prev and /slide with {"slide": index}, or GET /slide; every
+    answer is {"slide": index, "count": slides}. tests/mock_slideshow.py
+    serves the same protocol.
+    """
+
+    name = "http"
+
+    def __init__(self, url=None):
+        from http.client import HTTPConnection
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(url or SLIDE_URL)
+        self.path = parts.path.rstrip("/")
+        self.connection = HTTPConnection(parts.hostname, parts.port or 80, timeout=SLIDE_TIMEOUT)
+        self.slides = 0  # from the last answer, so a jump takes one request
+        self.position()
+
+    def request(self, method, path, body=None):
+        from http.client import HTTPException
+
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        for attempt in (1, 2):
+            try:
+                self.connection.request(method, self.path + path, data, headers)
+                response = self.connection.getresponse()
+                answer = response.read()
+                break
+            except (ConnectionResetError, BrokenPipeError):
+                # The viewer closed the idle connection; reconnect once (not
+                # after a timeout, which may have moved the slide already)
+                self.connection.close()
+                if attempt == 2:
+                    raise
+            except (OSError, HTTPException):
+                # A timeout or garbled answer leaves the connection mid-request,
+                # where http.client refuses every later one; start afresh next time
+                self.connection.close()
+                raise
+        if response.status != 200:
+            raise RuntimeError(f"Slide control {method} {path}: HTTP {response.status}")
+        state = json.loads(answer)
+        self.slides = state["count"]
+        self.slide = state["slide"] + 1
+        return state["slide"], state["count"]
+
+    def next(self):
+        self.request("POST", "/next")
+
+    def previous(self):
+        self.request("POST", "/prev")
+
+    def show(self, index):
+        self.request("POST", "/slide", {"slide": index})
+
+    def position(self):
+        return self.request("GET", "/slide")
+
+    def count(self):
+        return self.slides
+
+    def close(self):
+        self.connection.close()
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (UinputBackend, XTestBackend, XdotoolBackend, PyAutoGUIBackend, NullBackend, RecordingBackend,
+                    ImpressBackend, OkularBackend, HttpSlideBackend)
+}
+
+
+def get_backend(name="auto"):
+    """Create the named backend, or the first one that works on this machine for "auto" """
+    if name != "auto":
+        return BACKENDS[name]()
+
+    order = AUTO_ORDER if sys.platform.startswith("linux") else ["pyautogui"]
+    errors = []
+    for candidate in order:
+        try:
+            return BACKENDS[candidate]()
+        except Exception as e:
+            errors.append(f"{candidate}: {str(e)}")
+    raise RuntimeError(f"No usable key injection backend ({'; '.join(errors)})")
@@ -0,0 +1,115 @@
+import signal
+import threading
+import time
+
+from event_log import log_event
+
+# Configuration
+SUB_BUCKETS = 4  # per power of two, so a bucket is at most ~25% wide
+MAX_EXPONENT = 40  # 2^40 ns is about 18 minutes; anything slower lands in the last bucket
+
+# Intervals recorded per command, in the order they happen
+STAGES = (
+    "frame",  # bytes read -> line framed
+    "dispatch",  # line framed -> handler entered
+    "ack",  # bytes read -> OK written
+    "queue",  # action queued -> executor picked it up
+    "press",  # key injection itself
+    "total",  # bytes read -> key injected
+)
+
+
+def bucket_index(ns):
+    exponent = ns.bit_length()
+    if exponent < 3:
+        return ns
+    if exponent > MAX_EXPONENT:
+        return (MAX_EXPONENT - 2) * SUB_BUCKETS + SUB_BUCKETS - 1
+    return (exponent - 2) * SUB_BUCKETS + ((ns >> (exponent - 3)) & (SUB_BUCKETS - 1))
+
+
+def bucket_upper(index):
+    """Largest duration in ns that falls into bucket index"""
+    if index < SUB_BUCKETS:
+        return index
+    exponent = index // SUB_BUCKETS + 2
+    return ((SUB_BUCKETS + index % SUB_BUCKETS + 1) << (exponent - 3)) - 1
+
+
+class Histogram:
+    """Durations in fixed log-linear nanosecond buckets; recording is a few list/int operations"""
+
+    def __init__(self):
+        self.counts = [0] * ((MAX_EXPONENT - 1) * SUB_BUCKETS)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        # bucket_index() inlined, this runs several times per command
+        exponent = ns.bit_length()
+        if exponent < 3:
+            index = ns if ns > 0 else 0
+        elif exponent > MAX_EXPONENT:
+            index = len(self.counts) - 1
+        else:
+            index = (exponent - 2) * SUB_BUCKETS + ((ns >> (exponent - 3)) & (SUB_BUCKETS - 1))
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, fraction):
+        """Upper bound in ns of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket_upper(index), self.max_ns)
+        return self.max_ns
+
+    def reset(self):
+        self.__init__()
+
+
+# Global variables
+histograms = {stage: Histogram() for stage in STAGES}
+
+
+def record(stage, start_ns, end_ns=None):
+    """Add one interval to a stage; end defaults to now"""
+    if end_ns is None:
+        end_ns = time.perf_counter_ns()
+    histograms[stage].record(end_ns - start_ns)
+
+
+def report():
+    """One line per stage with count and p50/p90/p99/max in microseconds"""
+    lines = []
+    for stage in STAGES:
+        histogram = histograms[stage]
+        if not histogram.count:
+            lines.append(f"{stage:>8}: no samples")
+            continue
+        p50, p90, p99 = (histogram.percentile(fraction) / 1000 for fraction in (0.5, 0.9, 0.99))
+        lines.append(f"{stage:>8}: n={histogram.count} p50={p50:.1f} us p90={p90:.1f} us "
+                     f"p99={p99:.1f} us max={histogram.max_ns / 1000:.1f} us")
+    return lines
+
+
+def log_report(*_):
+    log_event("Latency by stage:")
+    for line in report():
+        log_event(line)
+
+
+def install_signal_handler():
+    """Log the latency report on SIGUSR1 (POSIX, main thread only)"""
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, log_report)
+        return True
+    return False
@@ -0,0 +1,113 @@
+import collections
+import threading
+import time
+
+import latency
+from binary_protocol import ACK_EVERY, AckWindow, encode_command
+from capture import WRITE
+
+# Configuration
+REPLY_TIMEOUT = 3.0  # seconds; the firmware's readString() sits out its 1 s stream timeout before replying
+REPLY_TYPES = frozenset(("PONG", "BATTERY"))  # frames that answer a request rather than report a button
+
+
+class Link:
+    """Protocol state of one connection to a remote, whatever does its I/O
+
+    Routes each frame: replies to the oldest request waiting for them, button
+    commands to on_command, binary ones through the cumulative ack window.
+    Subclasses (serial_mux.SerialMux, async_receiver.AsyncLink) read, send
+    and wait, and set closed to an Event of their kind.
+    """
+
+    received_ns = 0  # perf_counter_ns of the last read
+
+    def __init__(self, on_command, capture=None):
+        self.on_command = on_command  # False for a command it dropped, which the ACK then leaves uncovered
+        self.capture = capture  # capture.Capture that gets every byte read and written
+        self.pending_lock = threading.Lock()
+        self.pending = collections.defaultdict(collections.deque)  # reply type -> waiting requests, oldest first
+        self.closed = None
+        self.error = None
+        self.unmatched_replies = 0
+        self.framed_ns = 0  # when the frame being dispatched was framed
+
+        # Binary protocol state, switched on by the first binary frame from the remote
+        self.binary = False
+        self.acks = AckWindow()
+
+    def send(self, data):
+        raise NotImplementedError
+
+    def write(self, data):
+        self.send(data)
+        if self.capture:
+            self.capture.record(WRITE, data)
+
+    def encode(self, name):
+        """A command or request in the protocol the remote speaks"""
+        if self.binary:
+            return encode_command(name)
+        return name.encode() + b"\n"
+
+    def acknowledge(self):
+        """Confirm a command was taken; in binary mode the cumulative ACK already covers it"""
+        if not self.binary:
+            self.write(b"OK\n")
+            latency.record("ack", self.received_ns)
+
+    def flush_acks(self):
+        """Acknowledge every in-order button frame so far with one ACK"""
+        frame = self.acks.take_ack()
+        if frame:
+            self.write(frame)
+            latency.record("ack", self.received_ns)
+
+    def expect(self, reply, waiter):
+        """Queue a request's waiter (anything with set() and fail()) for the next reply of this type"""
+        with self.pending_lock:
+            if self.closed.is_set():
+                raise ConnectionError("Link is closed")
+            self.pending[reply].append(waiter)
+
+    def forget(self, reply, waiter):
+        """Take back a waiter whose request timed out"""
+        with self.pending_lock:
+            if waiter in self.pending[reply]:
+                self.pending[reply].remove(waiter)
+
+    def resolve(self, command, arg):
+        """Hand a reply to the oldest request waiting for it"""
+        with self.pending_lock:
+            waiting = self.pending[command]
+            waiter = waiting.popleft() if waiting else None
+        if waiter is None:
+            self.unmatched_replies += 1
+            return
+        waiter.set(arg)
+
+    def fail_pending(self, error):
+        """The link is gone: every request still waiting gets error"""
+        with self.pending_lock:
+            waiting = [waiter for waiters in self.pending.values() for waiter in waiters]
+            self.pending.clear()
+        for waiter in waiting:
+            waiter.fail(error)
+
+    def dispatch(self, frame, seq):
+        """Route one frame; seq is its sequence number, None for a text line"""
+        self.framed_ns = time.perf_counter_ns()
+        latency.record("frame", self.received_ns, self.framed_ns)
+
+        command, arg = frame
+        if seq is not None:
+            self.binary = True
+        if command in REPLY_TYPES:
+            self.resolve(command, arg)
+        elif seq is None:
+            self.on_command(command, arg)
+        elif self.acks.accept(seq):
+            if self.on_command(command, arg):
+                self.acks.advance(seq)
+            if self.acks.unacked >= ACK_EVERY:
+                self.flush_acks()
@@ -0,0 +1,303 @@
+# Connection and usage statistics from receiver logs, in one streaming pass
+# with constant memory, so a fleet's worth of aggregated logs is fine too.
+#
+#   python log_analytics.py [--json] [presentation_remote.log ...]
+#
+# Files are read in the order given, each as its own run of the receiver;
+# pass rotated logs oldest first (presentation_remote.log.3 ... .log).
+
+import json
+import sys
+import time
+
+from event_log import LOG_FILE
+from latency import Histogram
+from telemetry import READING_GAP
+
+# Configuration
+READ_BUFFER = 1 << 20  # bytes
+
+# Line prefixes after the timestamp; older receivers' wording included so old logs still count
+STARTS = (b"DIY Presentation Remote Receiver Starting", b"DIY Presentation Remote Hub Starting")
+EXITS = (b"Program exited", b"Program terminated by user")
+CONNECTED = b"Connected to ESP32 via "
+DROPS = (b"Error reading from ", b"No keepalive response", b"No ping response", b"Keepalive error")
+HANDSHAKE_OK = b"Communication verified with ESP32"
+HANDSHAKE_FAILED = (b"No handshake response received", b"Connection lost during handshake")
+COMMAND = b"Received command: "
+BATTERY = b"ESP32 Battery Level: "
+CONNECT_FAILED = b"Connection error: "
+KNOWN = (*STARTS, *EXITS, CONNECTED, *DROPS, HANDSHAKE_OK, *HANDSHAKE_FAILED, COMMAND, BATTERY, CONNECT_FAILED)
+
+
+class RemoteState:
+    """Connection state of one remote in the run being read"""
+
+    __slots__ = ("connected_at", "dropped_at", "last_reading", "linked")
+
+    def __init__(self):
+        self.connected_at = None
+        self.dropped_at = None
+        self.last_reading = None
+        self.linked = False  # connected or tried to; only then does the run count towards its uptime
+
+
+class LogStats:
+    """Accumulates statistics line by line; every field is a counter or the state of the current run
+
+    The hub and a receiver with several remotes put the remote's name in
+    front of its lines; connections, drops and battery readings are followed
+    per name, and uptime is connected time over the time each remote was
+    expected to be up, summed over remotes.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.lines = 0
+        self.runs = 0
+        self.observed = 0.0  # seconds covered by the logs
+        self.remote_observed = 0.0  # the same for every remote that was in use, summed
+        self.remote_names = set()
+        self.connected_time = 0.0
+        self.connections = 0
+        self.reconnects = 0
+        self.drops = 0
+        self.connect_errors = 0
+        self.handshakes_ok = 0
+        self.handshakes_failed = 0
+        self.commands = 0
+        self.commands_by_name = {}  # raw bytes, decoded once in summary()
+        self.busiest_minute = 0
+        self.reconnect_times = Histogram()  # drop to connected again, in ns like the latency histograms
+        self.battery_first = None
+        self.battery_last = None
+        self.battery_drained = 0.0
+        self.battery_seconds = 0.0
+
+        # State of the run being read
+        self.first_time = None
+        self.now = None
+        self.remotes = {}  # name (empty for an unnamed remote) -> RemoteState
+        self.minute = None
+        self.minute_commands = 0
+
+        # Timestamp parsing is cached per minute; most lines share one
+        self.minute_key = None
+        self.minute_epoch = 0
+
+    def timestamp(self, line):
+        """Epoch seconds of a "[YYYY-mm-dd HH:MM:SS] " line, or None if it has none"""
+        key = line[1:17]
+        if key != self.minute_key:
+            try:
+                self.minute_epoch = time.mktime((int(key[0:4]), int(key[5:7]), int(key[8:10]),
+                                                 int(key[11:13]), int(key[14:16]), 0, 0, 0, -1))
+            except ValueError:
+                return None
+            self.minute_key = key
+        try:
+            return self.minute_epoch + int(line[18:20])
+        except ValueError:
+            return None
+
+    def remote(self, name):
+        state = self.remotes.get(name)
+        if state is None:
+            state = self.remotes[name] = RemoteState()
+        return state
+
+    def end_connection(self, state):
+        if state.connected_at is not None:
+            self.connected_time += self.now - state.connected_at
+            state.connected_at = None
+
+    def end_run(self):
+        """The receiver stopped, or the file ended"""
+        if self.now is None:
+            return
+        duration = self.now - self.first_time
+        self.observed += duration
+        linked = [name for name, state in self.remotes.items() if state.linked]
+        self.remote_names.update(linked)
+        self.remote_observed += duration * max(1, len(linked))  # a run without any is downtime of its one remote
+        for state in self.remotes.values():
+            self.end_connection(state)
+        self.remotes.clear()
+        self.first_time = None
+
+    def feed(self, line):
+        self.lines += 1
+        if line[:1] != b"[" or line[20:22] != b"] ":
+            return  # continuation of a multi-line record
+        now = self.timestamp(line)
+        if now is None:
+            return
+        if self.first_time is None:
+            self.first_time = now
+        self.now = now
+        message = line[22:]
+        name = b""
+        if not message.startswith(KNOWN):
+            # A remote's "<name>: " in front, from the hub or a receiver with several remotes
+            prefix, separator, rest = message.partition(b": ")
+            if separator:
+                name, message = prefix, rest
+
+        if message.startswith(COMMAND):
+            self.command(now, message[len(COMMAND):].strip().strip(b"'"))
+        elif message.startswith(CONNECTED):
+            state = self.remote(name)
+            self.connections += 1
+            if state.dropped_at is not None:
+                self.reconnects += 1
+                self.reconnect_times.record(int((now - state.dropped_at) * 1e9))
+                state.dropped_at = None
+            state.connected_at = now
+            state.linked = True
+        elif message.startswith(DROPS):
+            state = self.remotes.get(name)
+            if state is not None and state.connected_at is not None:
+                self.drops += 1
+                self.end_connection(state)
+                state.dropped_at = now
+        elif message.startswith(HANDSHAKE_FAILED):
+            self.handshakes_failed += 1
+        elif message.startswith(HANDSHAKE_OK):
+            self.handshakes_ok += 1
+        elif message.startswith(BATTERY):
+            self.battery(self.remote(name), now, message[len(BATTERY):].strip().rstrip(b"%"))
+        elif message.startswith(CONNECT_FAILED):
+            self.connect_errors += 1
+            self.remote(name).linked = True
+        elif message.startswith(STARTS):
+            self.end_run()
+            self.runs += 1
+            self.first_time = now
+        elif message.startswith(EXITS):
+            for state in self.remotes.values():
+                self.end_connection(state)
+
+    def command(self, now, name):
+        self.commands += 1
+        self.commands_by_name[name] = self.commands_by_name.get(name, 0) + 1
+        minute = int(now // 60)
+        if minute != self.minute:
+            self.minute = minute
+            self.minute_commands = 0
+        self.minute_commands += 1
+        if self.minute_commands > self.busiest_minute:
+            self.busiest_minute = self.minute_commands
+
+    def battery(self, state, now, text):
+        try:
+            level = float(text)
+        except ValueError:
+            return
+        if self.battery_first is None:
+            self.battery_first = level
+        self.battery_last = level
+        previous = state.last_reading
+        if previous and now - previous[0] <= READING_GAP and level <= previous[1]:
+            self.battery_drained += previous[1] - level
+            self.battery_seconds += now - previous[0]
+        state.last_reading = (now, level)
+
+    def read(self, path):
+        """Feed a whole file; "-" reads stdin"""
+        self.files += 1
+        source = sys.stdin.buffer if path == "-" else open(path, "rb", buffering=READ_BUFFER)
+        try:
+            for line in source:
+                self.feed(line)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+        self.end_run()
+        self.now = None
+
+    def summary(self):
+        handshakes = self.handshakes_ok + self.handshakes_failed
+        connected_minutes = self.connected_time / 60
+        reconnect = self.reconnect_times
+        return {
+            "files": self.files,
+            "lines": self.lines,
+            "runs": self.runs,
+            "observed_hours": round(self.observed / 3600, 2),
+            "remotes": len(self.remote_names),
+            "connected_hours": round(self.connected_time / 3600, 2),
+            "uptime_percent": round(100 * self.connected_time / self.remote_observed, 1)
+            if self.remote_observed else None,
+            "connections": self.connections,
+            "drops": self.drops,
+            "reconnects": self.reconnects,
+            "connect_errors": self.connect_errors,
+            "reconnect_seconds": {
+                "p50": round(reconnect.percentile(0.5) / 1e9, 3),
+                "p90": round(reconnect.percentile(0.9) / 1e9, 3),
+                "p99": round(reconnect.percentile(0.99) / 1e9, 3),
+                "max": round(reconnect.max_ns / 1e9, 3),
+            } if reconnect.count else None,
+            "handshakes": handshakes,
+            "handshake_failure_percent": round(100 * self.handshakes_failed / handshakes, 1) if handshakes else None,
+            "commands": self.commands,
+            "commands_by_name": {name.decode("utf-8", "replace"): count
+                                 for name, count in self.commands_by_name.items()},
+            "commands_per_connected_minute": round(self.commands / connected_minutes, 2) if connected_minutes else None,
+            "busiest_minute_commands": self.busiest_minute,
+            "battery": {
+                "first_percent": self.battery_first,
+                "last_percent": self.battery_last,
+                "drained_percent": round(self.battery_drained, 2),
+                "percent_per_hour": round(self.battery_drained / (self.battery_seconds / 3600), 2)
+                if self.battery_seconds else None,
+            } if self.battery_first is not None else None,
+        }
+
+
+def format_table(summary):
+    def value(number, unit=""):
+        return "n/a" if number is None else f"{number}{unit}"
+
+    rows = [
+        ("Logs", f"{summary['files']} files, {summary['lines']} lines, {summary['runs']} receiver runs"),
+        ("Observed", f"{summary['observed_hours']} h"),
+        ("Connected", f"{summary['connected_hours']} h over {summary['remotes']} remotes "
+                      f"({value(summary['uptime_percent'], '%')} uptime)"),
+        ("Connections", f"{summary['connections']}, {summary['drops']} drops, {summary['reconnects']} reconnects, "
+                        f"{summary['connect_errors']} failed attempts"),
+    ]
+    reconnect = summary["reconnect_seconds"]
+    rows.append(("Reconnect time", "n/a" if reconnect is None else
+                 f"p50 {reconnect['p50']:.1f} s, p90 {reconnect['p90']:.1f} s, p99 {reconnect['p99']:.1f} s, "
+                 f"max {reconnect['max']:.1f} s"))
+    rows.append(("Handshakes", f"{summary['handshakes']}, {value(summary['handshake_failure_percent'], '%')} failed"))
+    commands = ", ".join(f"{name} {count}" for name, count in sorted(summary["commands_by_name"].items()))
+    rows.append(("Commands", f"{summary['commands']}" + (f" ({commands})" if commands else "")))
+    rows.append(("Commands/min", f"{value(summary['commands_per_connected_minute'])} while connected, "
+                                 f"{summary['busiest_minute_commands']} in the busiest minute"))
+    battery = summary["battery"]
+    rows.append(("Battery", "no readings" if battery is None else
+                 f"{battery['first_percent']}% -> {battery['last_percent']}%, "
+                 f"{value(battery['percent_per_hour'], '%')} per hour"))
+    return "\n".join(f"{label:>15}: {text}" for label, text in rows)
+
+
+def main():
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    paths = [arg for arg in args if arg != "--json"] or [LOG_FILE]
+    stats = LogStats()
+    try:
+        for path in paths:
+            stats.read(path)
+    except OSError as e:
+        print(f"Cannot read log: {str(e)}", file=sys.stderr)
+        return 1
+    summary = stats.summary()
+    print(json.dumps(summary, indent=2) if as_json else format_table(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import collections
+import os
+import threading
+
+import latency
+from event_log import log_event
+
+# Configuration
+METRICS_PORT = int(os.environ.get("NEXER_METRICS_PORT", "0")) or None  # e.g. 9464; unset to disable
+METRICS_HOST = "127.0.0.1"  # only ever served locally
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)  # seconds
+
+# Global variables
+# Each counter is only incremented by the one thread that owns the event, and
+# scrapes only read, so nothing here takes a lock
+commands = collections.Counter()  # received commands by name (registered commands only)
+counters = {
+    "unknown_commands": 0,
+    "acks": 0,
+    "connections": 0,
+    "disconnects": 0,
+    "keepalive_failures": 0,
+}
+gauges = {
+    "battery_percent": float("nan"),
+}
+gauge_callbacks = {}  # name -> (function read at scrape time, type), e.g. queue depth
+server = None
+
+HELP = {
+    "unknown_commands": "Lines from the remote that matched no registered command",
+    "acks": "OK acknowledgments written to the remote",
+    "connections": "Successful serial port opens",
+    "disconnects": "Serial links lost",
+    "keepalive_failures": "Keepalive probes that timed out or failed",
+    "battery_percent": "Last battery level reported by the remote",
+    "last_reconnect_seconds": "Time from the last drop to the next successful open",
+}
+
+
+def inc(name, amount=1):
+    counters[name] += amount
+
+
+def set_gauge(name, value):
+    gauges[name] = value
+
+
+def register_gauge(name, function, help_text="", kind="gauge"):
+    """Read a value from elsewhere at scrape time; kind="counter" for values that only grow"""
+    gauge_callbacks[name] = (function, kind)
+    if help_text:
+        HELP[name] = help_text
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = [
+        "# HELP nexer_commands_total Commands received from the remote",
+        "# TYPE nexer_commands_total counter",
+    ]
+    for name, count in list(commands.items()):
+        lines.append(f'nexer_commands_total{{command="{name}"}} {count}')
+
+    for name, value in list(counters.items()):
+        lines += [f"# HELP nexer_{name}_total {HELP.get(name, name)}", f"# TYPE nexer_{name}_total counter",
+                  f"nexer_{name}_total {value}"]
+
+    values = [(name, value, "gauge") for name, value in gauges.items()]
+    for name, (function, kind) in list(gauge_callbacks.items()):
+        try:
+            values.append((name, function(), kind))
+        except Exception:
+            continue
+    for name, value, kind in values:
+        metric = f"nexer_{name}_total" if kind == "counter" else f"nexer_{name}"
+        lines += [f"# HELP {metric} {HELP.get(name, name)}", f"# TYPE {metric} {kind}", f"{metric} {value}"]
+
+    lines += ["# HELP nexer_stage_latency_seconds Per-stage command latency",
+              "# TYPE nexer_stage_latency_seconds histogram"]
+    for stage in latency.STAGES:
+        histogram = latency.histograms[stage]
+        counts = list(histogram.counts)
+        for bound in LATENCY_BUCKETS:
+            bound_ns = bound * 1e9
+            below = sum(count for index, count in enumerate(counts) if latency.bucket_upper(index) <= bound_ns)
+            lines.append(f'nexer_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {below}')
+        lines.append(f'nexer_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {sum(counts)}')
+        lines.append(f'nexer_stage_latency_seconds_sum{{stage="{stage}"}} {histogram.total_ns / 1e9}')
+        lines.append(f'nexer_stage_latency_seconds_count{{stage="{stage}"}} {sum(counts)}')
+
+    return "\n".join(lines) + "\n"
+
+
+def start_exporter(port=None, host=METRICS_HOST):
+    """Serve /metrics on a background thread; http.server is only imported when this is used"""
+    global server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port or METRICS_PORT), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    log_event(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def stop_exporter():
+    global server
+    if server:
+        server.shutdown()
+        server.server_close()
+        server = None
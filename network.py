@@ -0,0 +1,320 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import socket
+import struct
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+import telemetry
+
+from async_receiver import COALESCE_REPEATS, AsyncLink, AsyncRemote
+from binary_protocol import SYNC
+from commands import COMMANDS_FILE
+from event_log import log_event
+from framer import ARG_COMMANDS, COMMANDS, LineFramer
+from transports import Transport
+
+# Configuration
+LISTEN_HOST = os.environ.get("NEXER_LISTEN_HOST", "127.0.0.1")  # 0.0.0.0 to accept Wi-Fi remotes and phones
+TCP_PORT = int(os.environ.get("NEXER_TCP_PORT", "0")) or None  # e.g. 3333; unset to not listen
+WEBSOCKET_PORT = int(os.environ.get("NEXER_WS_PORT", "0")) or None  # e.g. 8765; unset to not listen
+WEBSOCKET_ORIGINS = os.environ.get("NEXER_WS_ORIGINS", "")  # comma-separated browser origins allowed besides localhost pages, e.g. https://deck.example
+WEBSOCKET_TOKEN = os.environ.get("NEXER_WS_TOKEN")  # if set, clients must connect to ws://host:port/?token=...
+TCP_TOKEN = os.environ.get("NEXER_TCP_TOKEN") or WEBSOCKET_TOKEN  # if set, TCP clients must send "AUTH <token>" as their first line
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+READ_SIZE = 4096  # bytes per read from a client
+WRITE_HIGH_WATER = 16 * 1024  # bytes queued for a client before its commands stop being read
+DRAIN_TIMEOUT = 5.0  # seconds a client gets to read its backlog before it is dropped
+HANDSHAKE_TIMEOUT = 5.0  # seconds for the WebSocket upgrade request
+MAX_MESSAGE = 1024  # bytes; WebSocket messages are single commands
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"  # RFC 6455
+HTTP_METHODS = (b"GET ", b"POST ", b"PUT ", b"PATCH ", b"DELETE ", b"HEAD ", b"OPTIONS ", b"CONNECT ", b"TRACE ")
+
+# WebSocket opcodes
+CONTINUATION = 0x0
+TEXT = 0x1
+BINARY = 0x2
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+
+class ProtocolError(Exception):
+    """A client broke the WebSocket framing rules"""
+
+
+def websocket_frame(opcode, payload=b""):
+    """An unmasked (server to client) WebSocket frame"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack(">BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def http_like(line):
+    """An HTTP request line or header, as a browser page's POST would send; never a remote's command"""
+    return line.startswith(HTTP_METHODS) or b" HTTP/1." in line or b": " in line
+
+
+def unmask(data, mask):
+    key = (mask * (len(data) // 4 + 1))[:len(data)]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(len(data), "big")
+
+
+class StreamTransport(Transport):
+    """An accepted client connection; asyncio queues writes, so a slow client never blocks the loop"""
+
+    def __init__(self, writer, name):
+        super().__init__()
+        self.writer = writer
+        self.name = name
+
+    async def open(self):
+        pass
+
+    def write(self, data):
+        self.writer.write(data)
+
+    def backlog(self):
+        """Bytes written but not yet taken by the client"""
+        return self.writer.transport.get_write_buffer_size()
+
+    def close(self):
+        self.writer.close()
+
+
+class WebSocketTransport(StreamTransport):
+    """Replies go out as one WebSocket message each: text lines as text, binary protocol frames as binary"""
+
+    def write(self, data):
+        if data[0] == SYNC:
+            self.writer.write(websocket_frame(BINARY, data))
+        else:
+            self.writer.write(websocket_frame(TEXT, data.rstrip(b"\r\n")))
+
+
+class NetworkListener:
+    """Accepts remotes over TCP and WebSocket and serves each connection as a Remote of the receiver
+
+    Both speak the serial protocol (text lines or binary frames). Connections
+    are long-lived: a client sends any number of commands over one connection,
+    and the receiver's keepalive pings it when idle. A client that stops
+    reading its replies is no longer read from once WRITE_HIGH_WATER bytes are
+    queued for it, and is dropped if it has not caught up after DRAIN_TIMEOUT.
+    A WebSocket upgrade from a browser page is only accepted from localhost
+    or NEXER_WS_ORIGINS, and with NEXER_WS_TOKEN set only with that token.
+    A TCP connection whose first line is HTTP is dropped before anything in
+    it is dispatched, and with NEXER_TCP_TOKEN set it must start with AUTH.
+    """
+
+    def __init__(self, receiver, host=None, tcp_port=None, websocket_port=None, commands_file=COMMANDS_FILE,
+                 coalesce=None):
+        # Defaults are read here rather than bound at import, so they can be changed after importing
+        self.receiver = receiver
+        self.host = host or LISTEN_HOST
+        self.tcp_port = tcp_port or TCP_PORT
+        self.websocket_port = websocket_port or WEBSOCKET_PORT
+        self.commands_file = commands_file
+        self.coalesce = COALESCE_REPEATS if coalesce is None else coalesce
+        self.origins = {origin.strip().rstrip("/") for origin in WEBSOCKET_ORIGINS.split(",") if origin.strip()}
+        self.token = WEBSOCKET_TOKEN
+        self.tcp_token = TCP_TOKEN
+        self.servers = []
+        self.clients = 0  # connected right now
+
+    async def run(self):
+        if self.tcp_port:
+            self.servers.append(await asyncio.start_server(self.serve_tcp, self.host, self.tcp_port))
+            log_event(f"Listening for remotes on tcp://{self.host}:{self.tcp_port}")
+            if not self.tcp_token and self.host not in LOCAL_HOSTS:
+                log_event("Warning: any device on the network can press keys; set NEXER_TCP_TOKEN")
+        if self.websocket_port:
+            self.servers.append(await asyncio.start_server(self.serve_websocket, self.host, self.websocket_port))
+            log_event(f"Listening for remotes on ws://{self.host}:{self.websocket_port}")
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in self.servers))
+        finally:
+            for server in self.servers:
+                server.close()
+
+    async def serve_tcp(self, reader, writer):
+        host, port = writer.get_extra_info("peername")[:2]
+        if self.tcp_token:
+            try:
+                line = await asyncio.wait_for(reader.readuntil(b"\n"), HANDSHAKE_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                line = b""
+            if not hmac.compare_digest(line.strip(), b"AUTH " + self.tcp_token.encode()):
+                log_event(f"Refused TCP client {host}: missing or wrong token")
+                writer.close()
+                return
+        await self.serve(writer, StreamTransport(writer, f"tcp {host}:{port}"), self.read_tcp(reader), f"tcp {host}")
+
+    async def serve_websocket(self, reader, writer):
+        host, port = writer.get_extra_info("peername")[:2]
+        try:
+            upgraded = await asyncio.wait_for(self.handshake(reader, writer), HANDSHAKE_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            upgraded = False
+        if not upgraded:
+            writer.close()
+            return
+        await self.serve(writer, WebSocketTransport(writer, f"ws {host}:{port}"), self.read_websocket(reader, writer),
+                         f"ws {host}")
+
+    def origin_allowed(self, origin):
+        """Browsers name the page that opens a WebSocket; any other site's page must not press keys here"""
+        if origin is None:
+            return True  # not a browser
+        if origin.rstrip("/") in self.origins:
+            return True
+        return urlsplit(origin).hostname in LOCAL_HOSTS
+
+    def token_valid(self, target):
+        if not self.token:
+            return True
+        token = parse_qs(urlsplit(target).query).get("token", [""])[0]
+        return hmac.compare_digest(token.encode(), self.token.encode())
+
+    async def handshake(self, reader, writer):
+        """Answer the HTTP upgrade request; False if it was not one or is not allowed"""
+        request = await reader.readuntil(b"\r\n\r\n")
+        lines = request.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        target = parts[1] if len(parts) > 2 else ""
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        key = headers.get("sec-websocket-key")
+        if "websocket" not in headers.get("upgrade", "").lower() or not key:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            return False
+        refused = None
+        if not self.origin_allowed(headers.get("origin")):
+            refused = f"page from {headers['origin']} not in NEXER_WS_ORIGINS"
+        elif not self.token_valid(target):
+            refused = "missing or wrong token"
+        if refused:
+            log_event(f"Refused WebSocket client: {refused}")
+            writer.write(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            return False
+
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        return True
+
+    async def read_tcp(self, reader):
+        """The client's data, held back until its first line shows it is no browser's HTTP request"""
+        head = b""
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                return
+            if head is not None:
+                # Binary frames start with the sync byte, which no request line does
+                head += data
+                if head[0] != SYNC:
+                    newline = head.find(b"\n")
+                    if newline < 0 and len(head) < READ_SIZE:
+                        continue
+                    if http_like(head[:newline] if newline >= 0 else head):
+                        raise ProtocolError("Sent an HTTP request; a web page must not press keys here")
+                data, head = head, None
+            yield data
+
+    async def read_websocket(self, reader, writer):
+        """Payloads of the client's messages, text ones newline-terminated like serial lines"""
+        message = bytearray()
+        while True:
+            first, second = await reader.readexactly(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length, = struct.unpack(">H", await reader.readexactly(2))
+            elif length == 127:
+                length, = struct.unpack(">Q", await reader.readexactly(8))
+            if not second & 0x80:
+                raise ProtocolError("Unmasked frame from client")
+            if length > MAX_MESSAGE:
+                raise ProtocolError(f"Frame of {length} bytes")
+            mask = await reader.readexactly(4)
+            payload = unmask(await reader.readexactly(length), mask) if length else b""
+
+            if opcode == CLOSE:
+                writer.write(websocket_frame(CLOSE, payload[:2]))
+                return
+            if opcode == PING:
+                writer.write(websocket_frame(PONG, payload))
+                continue
+            if opcode == PONG:
+                continue
+            if opcode not in (CONTINUATION, TEXT, BINARY):
+                raise ProtocolError(f"Unknown opcode {opcode}")
+
+            message += payload
+            if len(message) > MAX_MESSAGE:
+                raise ProtocolError(f"Message of more than {MAX_MESSAGE} bytes")
+            if first & 0x80:
+                if message and message[0] != SYNC and not message.endswith(b"\n"):
+                    message += b"\n"
+                yield bytes(message)
+                message.clear()
+
+    async def serve(self, writer, transport, chunks, source):
+        """Run one client connection until it closes; source names the client without its ephemeral port"""
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+        remote = AsyncRemote(self.receiver, transport.name, commands_file=self.commands_file, coalesce=self.coalesce)
+        framer = LineFramer(*remote.registry.framer_tables(COMMANDS, ARG_COMMANDS))
+        link = remote.link = AsyncLink(transport, framer, remote.handle_command, watch=False)
+        self.receiver.remotes.append(remote)
+        self.receiver.executor.start()
+        self.clients += 1
+        metrics.inc("connections")
+        telemetry.record(telemetry.CONNECT, source)
+        remote.log("Connected")
+        keepalive = asyncio.create_task(remote.keepalive_task())
+
+        try:
+            async for data in chunks:
+                link.received_ns = time.perf_counter_ns()
+                while data and not link.closed.is_set():
+                    taken = framer.feed(data)
+                    if not taken:
+                        framer.drop_pending()
+                    data = data[taken:]
+                    link.process()
+                if link.closed.is_set():
+                    break
+
+                # Backpressure: stop reading a client that does not take its replies
+                if transport.backlog() > WRITE_HIGH_WATER:
+                    await asyncio.wait_for(writer.drain(), DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            remote.log("Client is not reading its replies, disconnecting")
+        except asyncio.IncompleteReadError:
+            pass
+        except Exception as e:
+            link.error = e
+        finally:
+            keepalive.cancel()
+            link.close(link.error)
+            self.receiver.remotes.remove(remote)
+            self.clients -= 1
+            metrics.inc("disconnects")
+            telemetry.record(telemetry.DISCONNECT, source)
+            remote.log(f"Disconnected: {str(link.error)}" if link.error else "Disconnected")
@@ -0,0 +1,87 @@
+# Configuration
+HOLD_GAP = 0.1  # seconds; the same command again within this is the button still being held
+REPEAT_DELAY = 0.5  # seconds held before auto-repeat starts; repeats before that are bounce
+REPEAT_RATE = 4.0  # presses per second when auto-repeat starts
+REPEAT_MAX_RATE = 20.0  # presses per second, reached after holding for a while
+REPEAT_ACCELERATION = 8.0  # presses per second gained per second of auto-repeat
+MAX_STEPS = 4  # most presses one event can turn into when repeats arrive slower than the rate
+
+
+class Hold:
+    """One button being held"""
+
+    __slots__ = ("started", "last", "tokens", "refilled")
+
+    def __init__(self, now):
+        self.started = now
+        self.last = now
+        self.tokens = 1.0  # so the first repeat goes out as soon as the delay is over
+        self.refilled = None
+
+
+class PressGate:
+    """Turns the stream a held button sends (one command per firmware loop) into keyboard-style auto-repeat
+
+    Only called from the serial reader thread. A command that starts a hold
+    passes at once; further ones are dropped as duplicates until REPEAT_DELAY,
+    then let through by a token bucket whose rate accelerates from REPEAT_RATE
+    to REPEAT_MAX_RATE. Events the bucket has no token for are coalesced into
+    the next one that passes, which may then press the key several times.
+    """
+
+    def __init__(self, hold_gap=HOLD_GAP, repeat_delay=REPEAT_DELAY, rate=REPEAT_RATE,
+                 max_rate=REPEAT_MAX_RATE, acceleration=REPEAT_ACCELERATION, max_steps=MAX_STEPS):
+        self.hold_gap = hold_gap
+        self.repeat_delay = repeat_delay
+        self.rate = rate
+        self.max_rate = max_rate
+        self.acceleration = acceleration
+        self.max_steps = max_steps
+        self.hold = None
+        self.held_command = None
+
+        self.events = 0
+        self.passed = 0
+        self.duplicates = 0
+        self.coalesced = 0
+        self.repeats = 0  # presses generated by auto-repeat
+
+    def admit(self, command, now_ns):
+        """How many times the key for this event should be pressed; 0 if the event was absorbed"""
+        self.events += 1
+        now = now_ns / 1e9
+        hold = self.hold
+        if hold is None or command != self.held_command or now - hold.last > self.hold_gap:
+            self.hold = Hold(now)
+            self.held_command = command
+            self.passed += 1
+            return 1
+
+        hold.last = now
+        held = now - hold.started
+        if held < self.repeat_delay:
+            self.duplicates += 1
+            return 0
+
+        repeating_since = hold.started + self.repeat_delay
+        rate = min(self.max_rate, self.rate + self.acceleration * (held - self.repeat_delay))
+        hold.tokens = min(self.max_steps, hold.tokens + rate * (now - (hold.refilled or repeating_since)))
+        hold.refilled = now
+
+        steps = int(hold.tokens)
+        if not steps:
+            self.coalesced += 1
+            return 0
+        hold.tokens -= steps
+        self.passed += 1
+        self.repeats += steps
+        return steps
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "passed": self.passed,
+            "duplicates": self.duplicates,
+            "coalesced": self.coalesced,
+            "repeats": self.repeats,
+        }
@@ -0,0 +1,212 @@
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+
+from event_log import log_event
+
+# Configuration
+PROFILE_MODE = os.environ.get("NEXER_PROFILE_MODE", "sample")  # sample (every thread) or cprofile (main thread only)
+PROFILE_SECONDS = float(os.environ.get("NEXER_PROFILE_SECONDS", "30"))
+PROFILE_DIR = os.environ.get("NEXER_PROFILE_DIR", ".")
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+# Global variables
+session = None  # the profile being taken, None when off
+lock = threading.RLock()  # reentrant: a signal can arrive while the main thread holds it
+
+
+def thread_stacks():
+    """Every thread's current stack, by thread name, as text"""
+    import traceback
+
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f"Thread {names.get(ident, ident)}:")
+        lines.extend(line.rstrip("\n") for line in traceback.format_stack(frame))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """Wall-clock sampling of every thread's stack from a thread of its own
+
+    Samples are counted per (thread name, stack of code objects), so the
+    cost while running is one sys._current_frames() walk per interval, and
+    there is no cost at all on the threads being sampled.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                self.stacks[(names.get(ident, str(ident)), tuple(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        """One "thread;outer;...;inner count" line per stack, for flamegraph.pl, speedscope and the like"""
+        with open(path, "w") as f:
+            for (name, stack), count in self.stacks.most_common():
+                f.write(";".join([name] + [label(code) for code in stack]) + f" {count}\n")
+
+    def write_pstats(self, path):
+        """The samples as a pstats file: a function's time is its samples times the interval"""
+        import marshal
+
+        stats = {}
+
+        def entry(code):
+            key = (code.co_filename, code.co_firstlineno, code.co_name)
+            if key not in stats:
+                stats[key] = [0, 0, 0.0, 0.0, {}]
+            return key, stats[key]
+
+        for (_, stack), count in self.stacks.items():
+            seconds = count * self.interval
+            seen = set()
+            caller = None
+            for depth, code in enumerate(stack):
+                key, stat = entry(code)
+                leaf = depth == len(stack) - 1
+                if key not in seen:  # recursion counts once towards cumulative time
+                    seen.add(key)
+                    stat[0] += count
+                    stat[1] += count
+                    stat[3] += seconds
+                if leaf:
+                    stat[2] += seconds
+                if caller is not None:
+                    edge = stat[4].get(caller, (0, 0, 0.0, 0.0))
+                    stat[4][caller] = (edge[0] + count, edge[1] + count,
+                                       edge[2] + (seconds if leaf else 0.0), edge[3] + seconds)
+                caller = key
+        with open(path, "wb") as f:
+            marshal.dump({key: tuple(stat) for key, stat in stats.items()}, f)
+
+
+class Session:
+    """One profile: stacks written at the start, profile files at the end"""
+
+    def __init__(self, mode, seconds):
+        import cProfile  # like the rest of profiling, only imported once a profile is taken
+
+        self.mode = mode
+        self.seconds = seconds
+        self.prefix = os.path.join(PROFILE_DIR, time.strftime("profile-%Y%m%d-%H%M%S"))
+        self.started = time.monotonic()
+        self.profile = cProfile.Profile() if mode == "cprofile" else Sampler()
+        self.timer = None
+
+    def start(self):
+        with open(f"{self.prefix}-stacks.txt", "w") as f:
+            f.write(thread_stacks())
+        if self.mode == "cprofile":
+            # Profiles the calling thread; from the signal handler that is the
+            # main thread, where the asyncio receivers run everything
+            self.profile.enable()
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        else:
+            self.profile.start()
+            self.timer = threading.Timer(self.seconds, stop_profile)
+            self.timer.name = "profile-timer"
+            self.timer.daemon = True
+            self.timer.start()
+
+    def stop(self):
+        """Stop profiling and write the files; returns their names"""
+        if self.mode == "cprofile":
+            self.profile.disable()
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            self.profile.dump_stats(f"{self.prefix}.pstats")
+            return [f"{self.prefix}.pstats"]
+        if self.timer:
+            self.timer.cancel()
+        self.profile.stop()
+        self.profile.write_pstats(f"{self.prefix}.pstats")
+        self.profile.write_collapsed(f"{self.prefix}.folded")
+        return [f"{self.prefix}.pstats", f"{self.prefix}.folded"]
+
+
+def start_profile(seconds=None, mode=None):
+    """Profile for seconds (PROFILE_SECONDS by default), dumping thread stacks first; False if already running"""
+    global session
+
+    with lock:
+        if session:
+            return False
+        started = Session(mode or PROFILE_MODE, seconds or PROFILE_SECONDS)
+        try:
+            started.start()
+        except (OSError, ValueError) as e:
+            log_event(f"Cannot start profiling: {str(e)}")
+            return False
+        session = started
+    log_event(f"Profiling ({started.mode}) for {started.seconds:g} s; thread stacks in {started.prefix}-stacks.txt")
+    return True
+
+
+def stop_profile():
+    """End the profile early, or when its time is up; writes the files"""
+    global session
+
+    with lock:
+        if not session:
+            return None
+        ended, session = session, None
+        try:
+            files = ended.stop()
+        except OSError as e:
+            log_event(f"Cannot write profile: {str(e)}")
+            return None
+    log_event(f"Profile of {time.monotonic() - ended.started:.1f} s written to {', '.join(files)}")
+    return files
+
+
+def toggle_profile(*_):
+    if session:
+        stop_profile()
+    else:
+        start_profile()
+
+
+def install_signal_handler():
+    """SIGUSR2 starts a profile, or ends the running one early (POSIX, main thread only)
+
+    Nothing else is installed until then: with profiling off the receiver
+    runs exactly as it does without this module.
+    """
+    if hasattr(signal, "SIGUSR2") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR2, toggle_profile)
+        signal.signal(signal.SIGALRM, lambda *_: stop_profile())  # cprofile mode's time limit
+        return True
+    return False
@@ -0,0 +1,343 @@
+import os
+import time
+
+import latency
+import metrics
+import profiler
+import telemetry
+
+from command_queue import CommandExecutor
+from commands import COMMANDS_FILE, Command, CommandRegistry
+from event_log import DEBUG, log_event, start_logging, stop_logging
+from idle import IdleState
+from input_backends import GOTO, get_backend
+from press_gate import PressGate
+
+# Configuration
+BAUD_RATE = 115200
+KEEPALIVE_INTERVAL = 30  # seconds without commands before the remote is pinged
+INPUT_BACKEND = os.environ.get("NEXER_INPUT_BACKEND", "auto")  # auto, uinput, xtest, xdotool, pyautogui, null; or impress, okular, http to drive the slideshow directly
+COALESCE_REPEATS = True  # a held button sends a command per firmware loop; turn that into keyboard-style auto-repeat
+
+
+class Remote:
+    """One remote: its link, held-button gate, command mapping and keepalive bookkeeping
+
+    What is the same whichever runtime serves the remote; the threaded
+    (threaded_receiver.py) and asyncio (async_receiver.py) receivers add
+    connecting, waiting and the keepalive loop. Subclasses set woken to an
+    Event of their kind and reconnects to a ReconnectManager.
+    """
+
+    def __init__(self, receiver, name=None, commands_file=COMMANDS_FILE, coalesce=True):
+        self.receiver = receiver
+        self.name = name
+        self.prefix = f"{name}: " if name else ""  # log prefix, only needed with several remotes
+        self.link = None
+        self.reconnects = None
+        self.woken = None  # set by a command after idling, or a new connection
+        self.gate = PressGate() if coalesce else None
+        self.registry = receiver.build_registry(self, commands_file)
+        self.idle = IdleState(KEEPALIVE_INTERVAL)
+        self.last_keepalive = 0.0
+        self.denied = 0  # presses refused by the receiver's arbitration
+        self.capture = None  # capture.Capture, when NEXER_CAPTURE is set
+        self.from_cache = False  # the link's port is discovery's last known one, opened without a probe
+
+    @property
+    def connected(self):
+        return self.link is not None and not self.link.closed.is_set()
+
+    def log(self, message, *args, **kwargs):
+        if args:
+            # The name goes in as an argument, so a % in it (fe80::1%eth0) is not taken for a format
+            log_event("%s" + message, self.prefix, *args, **kwargs)
+        else:
+            log_event(self.prefix + message, **kwargs)
+
+    def handle_command(self, command, arg=None):
+        """Dispatch a user command; runs wherever the link reads. False if it was dropped and should be resent"""
+        latency.record("dispatch", self.link.framed_ns)
+        self.log("Received command: '%s'", command)  # Add quotes to see if there are any hidden characters
+
+        if command == "SLEEP":
+            self.idle.sleep()
+            self.log("Remote asleep, keepalive paused until its next command")
+        elif self.idle.activity():
+            self.log("Remote active again")
+            self.woken.set()
+
+        entry = self.registry.get(command)
+        if entry is None:
+            metrics.inc("unknown_commands")
+            self.log(f"Unknown command: {command}")
+            return True
+        metrics.commands[command] += 1
+        telemetry.record(telemetry.COMMAND, command)
+
+        value = None
+        if entry.parse and arg is not None:
+            try:
+                value = entry.parse(arg)
+            except ValueError:
+                self.log(f"Invalid argument for {command}: '{arg}'")
+                return True
+
+        self.log("Processing %s command", command, level=DEBUG)
+        try:
+            accepted = entry.handler(value)
+        except ValueError as e:
+            self.log(f"Invalid argument for {command}: {str(e)}")
+            return True
+        if not accepted:
+            self.log(f"Command queue full, dropped {command}")
+            return False
+
+        if entry.ack:
+            self.link.acknowledge()  # right away
+            metrics.inc("acks")
+            self.log("Sent OK acknowledgment for %s", command, level=DEBUG)
+        return True
+
+    def connected_via(self, where):
+        """A new link is up: count it and restart the keepalive schedule"""
+        if self.capture:
+            self.capture.connected(where)
+        metrics.inc("connections")
+        telemetry.record(telemetry.CONNECT, self.name or "")
+        self.log(f"Connected to ESP32 via {where}")
+        self.reconnects.connected()
+        self.idle.activity()  # a remote waking from deep sleep reconnects first
+        self.woken.set()
+
+    def disconnected(self, where):
+        """The link dropped; True to reconnect at once, False to back off first"""
+        if self.link.error:
+            self.log(f"Error reading from {where}: {str(self.link.error)}")
+        metrics.inc("disconnects")
+        telemetry.record(telemetry.DISCONNECT, self.name or "")
+        return self.reconnects.lost()
+
+    def verified(self):
+        self.reconnects.verified()
+        self.log(f"Communication verified with ESP32 ({'binary' if self.link.binary else 'text'} protocol)")
+
+    def handshake_failed(self, error):
+        if isinstance(error, TimeoutError):
+            self.log("No handshake response received")
+        else:
+            self.log(f"Connection lost during handshake: {str(error)}")
+        if self.from_cache:
+            from discovery import forget_port
+            forget_port()  # maybe not the ESP32 any more; probe next time
+
+    def keepalive_wait(self):
+        """Seconds until the next keepalive; None while the remote is asleep or disconnected"""
+        due = self.idle.keepalive_due(self.last_keepalive) if self.connected else None
+        return None if due is None else max(0.0, due - time.monotonic())
+
+    def keepalive_start(self):
+        """Whether a keepalive is due now, and if so mark it sent"""
+        due = self.idle.keepalive_due(self.last_keepalive)
+        if not self.connected or due is None or time.monotonic() < due:
+            return False  # a command came in meanwhile
+        self.last_keepalive = time.monotonic()
+        self.idle.keepalive_sent()
+        self.log("Sent keepalive ping")
+        return True
+
+    def battery(self, battery_level):
+        """Report a BATTERY reply; a malformed one is logged, it says nothing about the link"""
+        try:
+            percent = float(battery_level)
+        except (TypeError, ValueError):  # None from an empty binary BATTERY frame
+            self.log(f"Invalid battery level: '{battery_level}'")
+            return
+        self.log(f"ESP32 Battery Level: {battery_level}%")
+        metrics.set_gauge("battery_percent", percent)
+        telemetry.record(telemetry.BATTERY, self.name or "", percent)
+
+    def keepalive_failed(self, link, error):
+        if isinstance(error, TimeoutError):
+            self.log("No keepalive response, reconnecting...")
+        else:
+            self.log(f"Keepalive error: {str(error)}")
+        metrics.inc("keepalive_failures")
+        link.close()
+
+    def close(self):
+        if self.link:
+            self.link.close()
+        if self.reconnects:
+            self.reconnects.close()
+        if self.capture:
+            self.capture.close()
+
+
+class Receiver:
+    """Key injection, command mapping and metrics shared by every remote of one receiver
+
+    Key presses run on the CommandExecutor thread since every backend blocks;
+    subclasses decide how links are read and provide a thread-safe stop().
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or INPUT_BACKEND
+        self.keys = None
+        self.executor = CommandExecutor(self.inject_key, setup=self.load_key_backend)
+        self.remotes = []
+
+    @property
+    def connected(self):
+        return any(remote.connected for remote in self.remotes)
+
+    def stop(self):
+        raise NotImplementedError
+
+    def load_key_backend(self):
+        """Import and open the key injection backend; runs on the executor thread"""
+        try:
+            self.keys = get_backend(self.backend)
+            log_event(f"Using {self.keys.name} key injection backend")
+        except Exception as e:
+            log_event(f"Cannot inject key presses: {str(e)}")
+            self.stop()
+            raise
+
+    def inject_key(self, action):
+        """Press a key, possibly several times, or jump to a slide, on the executor thread"""
+        key, count, received_ns = action
+        try:
+            if key == GOTO:
+                self.keys.goto(count)
+            else:
+                self.keys.press_times(key, count)
+        except Exception as e:
+            log_event(f"Key injection error: {str(e)}")
+            raise
+        latency.record("total", received_ns)
+
+    def allow(self, remote):
+        """Whether a key press from this remote should go through; every remote's does here"""
+        return True
+
+    def press_action(self, remote, spec):
+        """Handler factory: queue a key press, repeated by the argument if the command takes one"""
+        key = spec["key"]
+
+        def handler(arg):
+            if not self.allow(remote):
+                remote.denied += 1
+                return True  # refused, but acknowledged so the remote carries on
+            count = arg or 1
+            if remote.gate and arg is None:
+                count = remote.gate.admit(key, remote.link.received_ns)
+                if not count:
+                    return True  # absorbed, but still acknowledged so the remote carries on
+            return self.executor.submit((key, count, remote.link.received_ns))
+        return handler
+
+    def goto_action(self, remote, spec):
+        """Handler factory: queue a jump to the slide number given as the argument"""
+
+        def handler(arg):
+            if arg is None:
+                raise ValueError("missing slide number")
+            if not self.allow(remote):
+                remote.denied += 1
+                return True  # refused, but acknowledged so the remote carries on
+            return self.executor.submit((GOTO, arg, remote.link.received_ns))
+        return handler
+
+    def log_action(self, remote, spec):
+        """Handler factory: only log that the command arrived"""
+        message = spec["message"]
+
+        def handler(arg):
+            remote.log(message if arg is None else f"{message}: {arg}")
+            return True
+        return handler
+
+    def build_registry(self, remote, commands_file=COMMANDS_FILE):
+        """The built-in commands, extended by a commands file if there is one"""
+        actions = {
+            "press": lambda spec: self.press_action(remote, spec),
+            "goto": lambda spec: self.goto_action(remote, spec),
+            "log": lambda spec: self.log_action(remote, spec),
+        }
+        commands = CommandRegistry()
+        commands.register(Command("NEXT", actions["press"]({"key": "right"}), ack=True))
+        commands.register(Command("PREV", actions["press"]({"key": "left"}), ack=True))
+        commands.register(Command("SLEEP", actions["log"]({"message": "ESP32 entering sleep mode"})))
+
+        if commands_file and os.path.exists(commands_file):
+            count = commands.load(commands_file, actions)
+            remote.log(f"Loaded {count} commands from {commands_file}")
+        return commands
+
+    def register_metrics(self):
+        """Gauges read from receiver state when /metrics is scraped"""
+        remotes = self.remotes
+        metrics.register_gauge("connected", lambda: sum(remote.connected for remote in remotes),
+                               "Remotes whose link is up")
+        metrics.register_gauge("command_queue_depth", self.executor.depth, "Key presses waiting for the executor")
+        metrics.register_gauge("commands_dropped", lambda: self.executor.dropped,
+                               "Key presses dropped because the queue was full", kind="counter")
+        metrics.register_gauge("presses_denied", lambda: sum(remote.denied for remote in remotes),
+                               "Key presses refused by arbitration between remotes", kind="counter")
+        if any(remote.gate for remote in remotes):
+            metrics.register_gauge("presses_duplicate", lambda: sum(r.gate.duplicates for r in remotes if r.gate),
+                                   "Held-button repeats dropped before auto-repeat started", kind="counter")
+            metrics.register_gauge("presses_coalesced", lambda: sum(r.gate.coalesced for r in remotes if r.gate),
+                                   "Held-button repeats folded into the next auto-repeat", kind="counter")
+        metrics.register_gauge("slide", lambda: (self.keys and self.keys.current()) or float("nan"),
+                               "Slide on screen as of the last command, for backends that drive the presentation app")
+
+        def last_reconnect():
+            times = [remote.reconnects.reconnect_times[-1] for remote in remotes if remote.reconnects.reconnect_times]
+            return max(times) if times else float("nan")
+        metrics.register_gauge("last_reconnect_seconds", last_reconnect,
+                               "Time from the last drop to the next successful open")
+
+    def log_executor_stats(self):
+        """Log command queue depth and per-stage timings"""
+        stats = self.executor.stats()
+        log_event(
+            f"Command queue: depth {stats['depth']} (max {stats['max_depth']}), "
+            f"{stats['executed']} executed, {stats['dropped']} dropped, {stats['errors']} errors, "
+            f"avg wait {stats['avg_queue_wait_ms']:.2f} ms, avg press {stats['avg_execute_ms']:.2f} ms"
+        )
+        for remote in self.remotes:
+            if remote.gate:
+                stats = remote.gate.stats()
+                remote.log(
+                    f"Held buttons: {stats['events']} presses received, {stats['passed']} passed, "
+                    f"{stats['duplicates']} duplicates and {stats['coalesced']} coalesced, "
+                    f"{stats['repeats']} auto-repeats"
+                )
+
+    def close(self):
+        for remote in self.remotes:
+            remote.close()
+        self.executor.stop()
+        self.log_executor_stats()
+        if self.keys:
+            self.keys.close()
+
+
+def start_services(title):
+    """Logging, telemetry and the report signals every entry point starts with"""
+    start_logging()
+    telemetry.start_telemetry()
+    log_event(f"{title} Starting")
+    if latency.install_signal_handler():
+        log_event(f"Send SIGUSR1 to process {os.getpid()} for a latency report")
+    if profiler.install_signal_handler():
+        log_event(f"Send SIGUSR2 to process {os.getpid()} to profile for {profiler.PROFILE_SECONDS:g} s")
+
+
+def stop_services():
+    profiler.stop_profile()
+    log_event("Program exited")
+    telemetry.stop_telemetry()
+    stop_logging()
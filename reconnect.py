@@ -0,0 +1,188 @@
+import collections
+import os
+import random
+import select
+import struct
+import sys
+import time
+
+from event_log import log_event
+
+# Configuration
+RECONNECT_MIN_DELAY = 0.05  # seconds, first retry after a failed attempt
+RECONNECT_MAX_DELAY = 5  # seconds, backoff ceiling while the device stays away
+RECONNECT_JITTER = 0.2  # +/- fraction of the delay, so several receivers don't retry in lockstep
+DEVICE_POLL_INTERVAL = 0.25  # seconds, presence check where inotify is not available
+MIN_LINK_LIFETIME = 5  # seconds a verified link must have lasted for its drop to be retried at once
+
+# inotify(7)
+IN_ATTRIB = 0x004
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Wakes up when an entry in a directory is created or changed (Linux)"""
+
+    def __init__(self, directory):
+        import ctypes  # only once there is a device node to watch
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CREATE | IN_ATTRIB | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Cannot watch {directory}")
+
+    def read_names(self):
+        """Names of the entries with pending events; call when fd is readable"""
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def wait(self, name, timeout):
+        """Block up to timeout; True if an event for name arrived"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            if name in self.read_names():
+                return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollWatcher:
+    """Checks for the device node at a fixed interval (macOS, or no inotify)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def wait(self, name, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(min(DEVICE_POLL_INTERVAL, max(0, deadline - time.monotonic())))
+            if os.path.exists(self.path):
+                return True
+        return False
+
+    def close(self):
+        pass
+
+
+class ReconnectManager:
+    """Paces reconnect attempts: instant when the device reappears, exponential backoff with jitter while it is away
+
+    A link that opens and drops again before it was verified, or before
+    MIN_LINK_LIFETIME, backs off like a failed open; a peer that accepts and
+    hangs up at once must not be redialled in a tight loop.
+    """
+
+    def __init__(self, path=None):
+        self.path = None
+        self.has_node = False
+        self.watcher = None
+        self.delay = RECONNECT_MIN_DELAY
+        self.dropped_at = None
+        self.opened_at = None  # the current link, if one is up
+        self.link_verified = False
+        self.reconnect_times = collections.deque(maxlen=100)  # seconds from drop to reconnect
+        if path:
+            self.watch(path)
+
+    def watch(self, path):
+        """Follow this device path from now on; until one is known only the backoff applies"""
+        if path == self.path:
+            return
+        self.close()
+        self.path = path
+        self.watcher = None
+
+        # COM ports have no device node to watch either
+        self.has_node = os.path.isabs(path)
+        if self.has_node and sys.platform.startswith("linux"):
+            try:
+                self.watcher = InotifyWatcher(os.path.dirname(path))
+            except OSError as e:
+                log_event(f"inotify unavailable, polling for {path}: {str(e)}")
+        if self.has_node and self.watcher is None:
+            self.watcher = PollWatcher(path)
+
+    def device_present(self):
+        return not self.has_node or os.path.exists(self.path)
+
+    def dropped(self):
+        """The link went down; start timing the outage"""
+        if self.dropped_at is None:
+            self.dropped_at = time.monotonic()
+
+    def connected(self):
+        """The link is back; record how long it took. The backoff stays until the link proves itself"""
+        self.opened_at = time.monotonic()
+        self.link_verified = False
+        if self.dropped_at is not None:
+            outage = time.monotonic() - self.dropped_at
+            self.reconnect_times.append(outage)
+            self.dropped_at = None
+            log_event(f"Reconnected after {outage * 1000:.0f} ms")
+
+    def verified(self):
+        """The link answered the handshake"""
+        self.link_verified = True
+
+    def lost(self):
+        """The link went down; True if it was verified and held long enough to retry at once, which resets the backoff"""
+        self.dropped()
+        held = self.link_verified and time.monotonic() - self.opened_at >= MIN_LINK_LIFETIME
+        self.opened_at = None
+        self.link_verified = False
+        if held:
+            self.delay = RECONNECT_MIN_DELAY
+        return held
+
+    def next_delay(self):
+        """Jittered delay before the next attempt; the one after will be twice as long"""
+        self.dropped()
+        delay = self.delay * random.uniform(1 - RECONNECT_JITTER, 1 + RECONNECT_JITTER)
+        self.delay = min(self.delay * 2, RECONNECT_MAX_DELAY)
+        return delay
+
+    def wait(self):
+        """Wait before the next attempt; returns early if the device node (re)appears"""
+        delay = self.next_delay()
+
+        if self.watcher is None:
+            time.sleep(delay)
+            return
+
+        if self.device_present():
+            # Present but not openable yet (e.g. the Bluetooth link is still
+            # coming up): plain backoff
+            time.sleep(delay)
+            return
+
+        log_event(f"Waiting up to {delay:.1f} s for {self.path} to appear")
+        if self.watcher.wait(os.path.basename(self.path), delay):
+            self.delay = RECONNECT_MIN_DELAY
+
+    def close(self):
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
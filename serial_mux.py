@@ -0,0 +1,93 @@
+import threading
+
+from link import REPLY_TIMEOUT, Link
+from serial_reader import READ_TIMEOUT, LineReader
+
+
+class Reply:
+    """A request waiting for its reply (lighter to import than concurrent.futures)"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def set(self, value):
+        self.value = value
+        self.done.set()
+
+    def fail(self, error):
+        self.error = error
+        self.done.set()
+
+    def wait(self, timeout):
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"No reply within {timeout} s")
+        if self.error:
+            raise self.error
+        return self.value
+
+
+class SerialMux(Link):
+    """Sole owner of the serial port: one reader thread, serialized writes, replies routed to waiting requests"""
+
+    def __init__(self, port, on_command, framer=None, capture=None):
+        super().__init__(on_command, capture)
+        self.port = port
+        self.reader = LineReader(port, framer=framer, capture=capture)
+        self.write_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.thread = None
+        self.reader.on_idle = self.flush_acks
+
+    @property
+    def received_ns(self):
+        return self.reader.received_ns
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="serial-reader", daemon=True)
+        self.thread.start()
+
+    def send(self, data):
+        self.port.write(data)
+
+    def write(self, data):
+        with self.write_lock:
+            super().write(data)
+
+    def request(self, name, reply, timeout=REPLY_TIMEOUT):
+        """Send a request and wait for the matching reply's argument; raises TimeoutError or ConnectionError"""
+        data = self.encode(name)
+        waiter = Reply()
+        self.expect(reply, waiter)
+        try:
+            self.write(data)
+            return waiter.wait(timeout)
+        except TimeoutError:
+            self.forget(reply, waiter)
+            raise
+
+    def run(self):
+        try:
+            while not self.closed.is_set():
+                frame = self.reader.read_frame()
+                if frame is not None:
+                    self.dispatch(frame, self.reader.framer.seq)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.closed.set()
+            self.fail_pending(ConnectionError("Serial port closed"))
+
+    def close(self):
+        """Stop the reader thread and close the port"""
+        self.closed.set()
+        self.reader.interrupt()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(READ_TIMEOUT + 1)
+        try:
+            self.port.close()
+        except Exception:
+            pass
+        if not (self.thread and self.thread.is_alive()):
+            self.reader.close()
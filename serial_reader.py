@@ -0,0 +1,83 @@
+import os
+import select
+import time
+
+from capture import READ
+from framer import LineFramer
+
+# Configuration
+READ_TIMEOUT = 1.0  # seconds, upper bound on a blocking read() for ports without a file descriptor
+
+
+class LineReader:
+    """Hand out command frames from a serial port as soon as their newline arrives"""
+
+    def __init__(self, port, timeout=None, framer=None, capture=None):
+        self.port = port
+        self.timeout = timeout  # None waits for data (or interrupt()) however long it takes
+        self.framer = framer or LineFramer()
+        self.capture = capture  # capture.Capture that gets every byte read
+        self.received_ns = 0  # perf_counter_ns of the last read, for latency stats
+        self.on_idle = None  # called when the buffered frames are used up, before waiting for more
+
+        # Ports without a file descriptor (Windows, loop:// URLs) fall back on
+        # a blocking read() bounded by the port timeout
+        try:
+            self.fd = port.fileno()
+        except Exception:
+            self.fd = None
+            port.timeout = timeout or READ_TIMEOUT
+
+        # Without a timeout, interrupt() writes to this pipe to end a wait
+        self.wake_read, self.wake_write = os.pipe() if self.fd is not None and timeout is None else (None, None)
+        self.watched = [self.fd] if self.wake_read is None else [self.fd, self.wake_read]
+
+    def wait(self):
+        """Block until the port is readable, the timeout expires or interrupt() is called"""
+        if self.fd is None:
+            return True
+        readable, _, _ = select.select(self.watched, [], [], self.timeout)
+        return self.fd in readable
+
+    def interrupt(self):
+        """Wake a wait() in progress, e.g. to close the port"""
+        if self.wake_write is not None:
+            try:
+                os.write(self.wake_write, b"\0")
+            except OSError:
+                pass
+
+    def close(self):
+        for fd in (self.wake_read, self.wake_write):
+            if fd is not None:
+                os.close(fd)
+        self.wake_read = self.wake_write = None
+
+    def read_frame(self):
+        """Return the next (command, arg) frame, or None if nothing complete arrived in time"""
+        while True:
+            frame = self.framer.next_frame()
+            if frame:
+                return frame
+
+            if self.on_idle:
+                self.on_idle()
+            if not self.wait():
+                return None
+
+            if self.fd is not None:
+                # Bulk read straight into the framer's buffer
+                received = self.framer.read_from(self.fd)
+                self.received_ns = time.perf_counter_ns()
+                if self.capture and received:
+                    self.capture.record(READ, self.framer.view[self.framer.end - received:self.framer.end])
+            else:
+                # Take everything that is already there, or block for the first byte
+                space = len(self.framer.space())
+                data = self.port.read(min(self.port.in_waiting or 1, space))
+                if not data:
+                    return None
+                self.framer.feed(data)
+                self.received_ns = time.perf_counter_ns()
+                if self.capture:
+                    self.capture.record(READ, data)
@@ -0,0 +1,278 @@
+# Battery readings and command events for trends across talks: battery drain
+# per hour of presenting and press rate per talk. Off unless NEXER_TELEMETRY
+# names the database, e.g. NEXER_TELEMETRY=telemetry.db.
+#
+#   python telemetry.py [talks | battery] [--since 7d] [--json] [--db telemetry.db]
+#
+# Events go into a fixed-size ring of packed records in memory; a writer
+# thread moves them to SQLite in batches, so recording one is a struct.pack
+# under a lock that is only ever held for a copy.
+
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+from event_log import log_event
+
+# Configuration
+TELEMETRY_FILE = os.environ.get("NEXER_TELEMETRY")  # SQLite database, e.g. telemetry.db; unset or "none" to not record
+RING_SIZE = 4096  # records held in memory before the oldest unwritten ones are dropped
+MAX_NAMES = 1024  # distinct event names kept per run; later new ones are recorded without a name
+FLUSH_INTERVAL = 10.0  # seconds from the first unwritten record to the write
+TALK_GAP = 30 * 60  # seconds without commands that separate two talks
+READING_GAP = 10 * 60  # seconds; battery readings further apart than this are not counted as one stretch
+
+RECORD = struct.Struct("<dBHf")  # time, kind, name index, value
+
+# Event kinds
+COMMAND = 1
+BATTERY = 2
+CONNECT = 3
+DISCONNECT = 4
+KINDS = {COMMAND: "command", BATTERY: "battery", CONNECT: "connect", DISCONNECT: "disconnect"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (time REAL NOT NULL, kind TEXT NOT NULL, name TEXT, value REAL);
+CREATE INDEX IF NOT EXISTS events_time ON events (kind, time);
+"""
+
+# Global variables
+store = None
+
+
+class TelemetryStore:
+    """Ring buffer of packed records, written to SQLite by a background thread
+
+    The writer only wakes for the first record after the ring was emptied and
+    then waits FLUSH_INTERVAL (less if the ring fills up) to take a whole batch,
+    so an idle receiver causes no wakeups at all.
+    """
+
+    def __init__(self, path, size=RING_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.size = size
+        self.flush_interval = flush_interval
+        self.ring = bytearray(size * RECORD.size)
+        self.head = 0  # next slot to fill
+        self.pending = 0  # filled slots not yet written
+        self.dropped = 0  # records overwritten before they were written
+        self.written = 0
+        self.names = [""]  # index 0 is "no name"
+        self.name_codes = {"": 0}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()  # the ring went from empty to not empty
+        self.urgent = threading.Event()  # half full, or stopping
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="telemetry-writer", daemon=True)
+
+    def record(self, kind, name="", value=0.0):
+        with self.lock:
+            code = self.name_codes.get(name)
+            if code is None:
+                if len(self.names) < MAX_NAMES:
+                    code = self.name_codes[name] = len(self.names)
+                    self.names.append(name)
+                else:
+                    code = 0
+            RECORD.pack_into(self.ring, self.head * RECORD.size, time.time(), kind, code, value)
+            self.head = (self.head + 1) % self.size
+            if self.pending == self.size:
+                self.dropped += 1  # the writer fell behind; the oldest record was just overwritten
+            else:
+                self.pending += 1
+            if self.pending == 1:
+                self.wake.set()
+            elif self.pending == self.size // 2:
+                self.urgent.set()
+
+    def take(self):
+        """Copy out the unwritten records and free their slots"""
+        with self.lock:
+            start = (self.head - self.pending) % self.size * RECORD.size
+            end = start + self.pending * RECORD.size
+            if end <= len(self.ring):
+                data = bytes(self.ring[start:end])
+            else:
+                data = bytes(self.ring[start:]) + bytes(self.ring[:end - len(self.ring)])
+            self.pending = 0
+            names = list(self.names)
+        return data, names
+
+    def flush(self, connection):
+        data, names = self.take()
+        if not data:
+            return
+        rows = [(when, KINDS[kind], names[code] or None, value)
+                for when, kind, code, value in RECORD.iter_unpack(data)]
+        with connection:
+            connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", rows)
+        self.written += len(rows)
+
+    def run(self):
+        import sqlite3  # here rather than at startup: the receiver imports this module first thing
+
+        # SQLite connections stay on the thread that opened them
+        try:
+            connection = sqlite3.connect(self.path)
+            connection.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            log_event(f"Cannot open telemetry database {self.path}: {str(e)}")
+            return
+        try:
+            while not self.stopping:
+                self.wake.wait()
+                self.wake.clear()
+                self.urgent.wait(self.flush_interval)
+                self.urgent.clear()
+                try:
+                    self.flush(connection)
+                except sqlite3.Error as e:
+                    log_event(f"Telemetry write failed: {str(e)}")
+            self.flush(connection)
+        finally:
+            connection.close()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """Write out everything still in the ring and stop the writer"""
+        self.stopping = True
+        self.wake.set()
+        self.urgent.set()
+        self.thread.join(5)
+
+
+def record(kind, name="", value=0.0):
+    """Add an event if telemetry is running; never waits on the database"""
+    if store is not None:
+        store.record(kind, name, value)
+
+
+def start_telemetry(path=None):
+    global store
+    path = TELEMETRY_FILE if path is None else path
+    if store is None and path and path != "none":
+        store = TelemetryStore(path)
+        store.start()
+
+
+def stop_telemetry():
+    global store
+    if store is not None:
+        store.stop()
+        if store.dropped:
+            log_event(f"Telemetry dropped {store.dropped} events the writer could not keep up with")
+        store = None
+
+
+def battery_drain(rows):
+    """Percent drained, hours covered and readings from (time, value) rows in time order
+
+    Consecutive readings count as one stretch unless they are more than
+    READING_GAP apart; rises (charging) are skipped.
+    """
+    drained = 0.0
+    seconds = 0.0
+    readings = 0
+    previous = None
+    for when, value in rows:
+        readings += 1
+        if previous and when - previous[0] <= READING_GAP and value <= previous[1]:
+            drained += previous[1] - value
+            seconds += when - previous[0]
+        previous = (when, value)
+    return drained, seconds / 3600, readings
+
+
+def battery(connection, since=0.0):
+    drained, hours, readings = battery_drain(connection.execute(
+        "SELECT time, value FROM events WHERE kind = 'battery' AND time >= ? ORDER BY time", (since,)))
+    return {
+        "readings": readings,
+        "hours": round(hours, 2),
+        "drained_percent": round(drained, 2),
+        "percent_per_hour": round(drained / hours, 2) if hours else None,
+    }
+
+
+def talks(connection, since=0.0, gap=TALK_GAP):
+    """One entry per talk: commands separated by less than gap, with press rate and battery drain"""
+    result = []
+    talk = None
+    for when, name in connection.execute(
+            "SELECT time, name FROM events WHERE kind = 'command' AND time >= ? ORDER BY time", (since,)):
+        if talk is None or when - talk["end"] > gap:
+            talk = {"start": when, "end": when, "presses": 0, "commands": {}}
+            result.append(talk)
+        talk["end"] = when
+        talk["presses"] += 1
+        talk["commands"][name] = talk["commands"].get(name, 0) + 1
+
+    for talk in result:
+        minutes = (talk["end"] - talk["start"]) / 60
+        talk["minutes"] = round(minutes, 1)
+        talk["per_minute"] = round(talk["presses"] / minutes, 2) if minutes else None
+        drained, hours, _ = battery_drain(connection.execute(
+            "SELECT time, value FROM events WHERE kind = 'battery' AND time BETWEEN ? AND ? ORDER BY time",
+            (talk["start"], talk["end"])))
+        talk["battery_percent_per_hour"] = round(drained / hours, 2) if hours else None
+    return result
+
+
+def parse_since(text):
+    """Seconds since the epoch for "7d", "12h", "30m" back from now"""
+    units = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+    if text[-1:] in units:
+        return time.time() - float(text[:-1]) * units[text[-1]]
+    return time.time() - float(text)
+
+
+def format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def main():
+    args = sys.argv[1:]
+    path = args[args.index("--db") + 1] if "--db" in args else TELEMETRY_FILE or "telemetry.db"
+    since = parse_since(args[args.index("--since") + 1]) if "--since" in args else 0.0
+    as_json = "--json" in args
+    query = args[0] if args and not args[0].startswith("--") else "talks"
+    if query not in ("talks", "battery"):
+        print("usage: telemetry.py [talks | battery] [--since 7d] [--json] [--db telemetry.db]")
+        return 2
+    if not os.path.exists(path):
+        print(f"No telemetry at {path}")
+        return 1
+
+    import sqlite3
+
+    connection = sqlite3.connect(path)
+    try:
+        result = talks(connection, since) if query == "talks" else battery(connection, since)
+    finally:
+        connection.close()
+
+    if as_json:
+        print(json.dumps(result, indent=2))
+    elif query == "battery":
+        rate = result["percent_per_hour"]
+        print(f"{result['readings']} readings over {result['hours']} h of presenting, "
+              f"{result['drained_percent']}% drained, "
+              f"{'n/a' if rate is None else f'{rate}%'} per hour")
+    else:
+        print(f"{'start':<17} {'minutes':>8} {'presses':>8} {'per min':>8} {'battery/h':>10}  commands")
+        for talk in result:
+            rate = talk["per_minute"]
+            drain = talk["battery_percent_per_hour"]
+            commands = ", ".join(f"{name} {count}" for name, count in sorted(talk["commands"].items()))
+            print(f"{format_time(talk['start']):<17} {talk['minutes']:>8} {talk['presses']:>8} "
+                  f"{'-' if rate is None else rate:>8} {'-' if drain is None else f'{drain}%':>10}  {commands}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
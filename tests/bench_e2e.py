@@ -0,0 +1,88 @@
+# End-to-end benchmark of the receiver (main.py) against the simulated ESP32:
+# press-to-injection latency and ack round trip at a given press rate and
+# burst pattern, then the highest sustained rate with several presses in flight.
+#
+#   python tests/bench_e2e.py [presses] [presses/s] [burst length] [window]
+
+import statistics
+import sys
+import time
+
+from esp32_sim import ESP32Simulator, start_receiver, stop_receiver
+
+PRESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+RATE = float(sys.argv[2]) if len(sys.argv) > 2 else 20  # presses per second, firmware-paced
+BURST = int(sys.argv[3]) if len(sys.argv) > 3 else 1  # presses sent back to back before pausing
+WINDOW = int(sys.argv[4]) if len(sys.argv) > 4 else 8  # unacked presses allowed in the flood phase
+FLOOD_PRESSES = 5000
+
+
+def percentiles(values):
+    ms = sorted(value * 1000 for value in values)
+    if not ms:
+        return "no samples"
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    return f"p50 {statistics.median(ms):7.3f} ms  p99 {p99:7.3f} ms  max {ms[-1]:7.3f} ms"
+
+
+def wait_injected(keys, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(keys.presses) < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return len(keys.presses) >= count
+
+
+def paced(sim, receiver):
+    """Firmware-like presses: each one waits for its OK, bursts separated by the rate's interval"""
+    keys = receiver.keys
+    first = len(keys.presses)
+    sent = []
+    rtts = []
+    interval = BURST / RATE
+    next_burst = time.perf_counter()
+    while len(sent) < PRESSES:
+        for _ in range(min(BURST, PRESSES - len(sent))):
+            sent_at, rtt = sim.press("NEXT" if sim.random.random() < 0.8 else "PREV")
+            sent.append(sent_at)
+            if rtt is not None:
+                rtts.append(rtt)
+        next_burst += sim.jitter(interval)
+        time.sleep(max(0, next_burst - time.perf_counter()))
+
+    wait_injected(keys, first + len(sent))
+    injected = [at for _, at in keys.presses[first:first + len(sent)]]
+    latencies = [done - start for start, done in zip(sent, injected)]
+    return latencies, rtts, len(sent) - len(rtts)
+
+
+def flood(sim, receiver):
+    """Presses with up to WINDOW acks outstanding; sustained commands per second"""
+    keys = receiver.keys
+    first = len(keys.presses)
+    base = sim.acked
+    start = time.perf_counter()
+    for index in range(FLOOD_PRESSES):
+        if index >= WINDOW and not sim.wait_acks(base + index - WINDOW + 1):
+            break
+        sim.press("NEXT", wait_ack=False)
+    sim.wait_acks(base + FLOOD_PRESSES, timeout=5)
+    wait_injected(keys, first + FLOOD_PRESSES)
+    elapsed = time.perf_counter() - start
+    return len(keys.presses) - first, elapsed
+
+
+if __name__ == "__main__":
+    sim = ESP32Simulator()
+    receiver = start_receiver(sim.port)
+    try:
+        latencies, rtts, missed = paced(sim, receiver)
+        print(f"{PRESSES} presses at {RATE:g}/s in bursts of {BURST}:")
+        print(f"  press -> injection: {percentiles(latencies)}")
+        print(f"  ack round trip:     {percentiles(rtts)}")
+        print(f"  missed acks:        {missed}")
+
+        injected, elapsed = flood(sim, receiver)
+        print(f"flood, {WINDOW} in flight: {injected} injected in {elapsed:.2f} s = {injected / elapsed:,.0f} commands/s")
+    finally:
+        stop_receiver(receiver)
+        sim.close()
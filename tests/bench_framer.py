@@ -0,0 +1,117 @@
+# Throughput of the LineFramer against the old readline().decode().strip()
+# path, on a synthetic stream of firmware output. Both are run over a pty
+# (the real receive path) and in memory (parsing cost alone; BytesIO's C
+# readline is a lower bound the old code never got, pyserial reads a byte
+# at a time).
+#
+#   python tests/bench_framer.py [millions of commands]
+
+import io
+import os
+import pty
+import random
+import sys
+import threading
+import time
+
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from framer import LineFramer
+from serial_reader import LineReader
+
+COMMANDS = int(float(sys.argv[1]) * 1_000_000) if len(sys.argv) > 1 else 1_000_000
+CHUNK = 512  # bytes handed over per read, roughly one RFCOMM frame's worth
+
+
+def make_stream(count):
+    random.seed(1)
+    lines = [b"NEXT\r\n"] * 60 + [b"PREV\r\n"] * 30 + [b"PONG\r\n"] * 5 + [b"BATTERY:87.50\r\n"] * 4 + [b"\x00\x00NEXT\r\n"]
+    return b"".join(random.choice(lines) for _ in range(count))
+
+
+def parse_old(readline):
+    """The old per-command path; returns the count and when the last command was seen"""
+    count = 0
+    last_seen = time.perf_counter()
+    for raw in iter(readline, b""):
+        command = raw.decode('utf-8').strip()
+        if command == "NEXT" or command == "PREV" or command == "PONG" or command.startswith("BATTERY:"):
+            count += 1
+        elif command:
+            count += 1
+        last_seen = time.perf_counter()
+    return count, last_seen
+
+
+def bench_readline(stream):
+    start = time.perf_counter()
+    count, last_seen = parse_old(io.BytesIO(stream).readline)
+    return count, last_seen - start
+
+
+def over_pty(stream, consume):
+    """Push the stream through a pty and time consume(port) until it has seen every command"""
+    master, slave = pty.openpty()
+    port = serial.Serial(os.ttyname(slave), 115200, timeout=0.5)
+
+    def write_all():
+        view = memoryview(stream)
+        while view:
+            view = view[os.write(master, view[:4096]):]
+
+    writer = threading.Thread(target=write_all, daemon=True)
+    start = time.perf_counter()
+    writer.start()
+    count, last_seen = consume(port)
+    writer.join()
+    port.close()
+    os.close(master)
+    os.close(slave)
+    return count, last_seen - start
+
+
+def pty_readline(port):
+    # readline() returns b"" once the stream has been quiet for the port timeout
+    return parse_old(port.readline)
+
+
+def pty_framer(port):
+    reader = LineReader(port, timeout=0.5)
+    count = 0
+    last_seen = time.perf_counter()
+    while reader.read_frame():
+        count += 1
+        last_seen = time.perf_counter()
+    return count, last_seen
+
+
+def bench_framer(stream):
+    framer = LineFramer()
+    view = memoryview(stream)
+    count = 0
+    start = time.perf_counter()
+    for offset in range(0, len(stream), CHUNK):
+        chunk = view[offset:offset + CHUNK]
+        while chunk:
+            taken = framer.feed(chunk)
+            chunk = chunk[taken:]
+            frame = framer.next_frame()
+            while frame:
+                count += 1
+                frame = framer.next_frame()
+    return count, time.perf_counter() - start
+
+
+def report(name, result):
+    count, elapsed = result
+    print(f"{name:>12}: {count} commands in {elapsed:6.2f} s = {count / elapsed / 1e6:5.2f} M commands/s")
+
+
+if __name__ == "__main__":
+    stream = make_stream(COMMANDS)
+    print(f"{len(stream) / 1e6:.1f} MB, {COMMANDS} commands")
+    report("pty readline", over_pty(stream, pty_readline))
+    report("pty framer", over_pty(stream, pty_framer))
+    report("mem readline", bench_readline(stream))
+    report("mem framer", bench_framer(stream))
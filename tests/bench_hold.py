@@ -0,0 +1,56 @@
+# What a held button does to the receiver: the firmware sends NEXT on every
+# loop iteration (10 ms delay plus the ack wait) for as long as the button is
+# down, so even a short click arrives as several NEXTs. Compares the slides
+# actually advanced with and without host-side coalescing.
+#
+#   python tests/bench_hold.py [hold seconds] [clicks]
+
+import sys
+import time
+
+from esp32_sim import ESP32Simulator, start_receiver, stop_receiver
+
+HOLD = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+CLICKS = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+CLICK_LENGTH = 0.1  # seconds a quick click keeps the button down
+LOOP_DELAY = 0.01  # the firmware's delay(10) at the end of loop()
+
+
+def button_down(sim, seconds):
+    """The firmware loop while the button stays LOW: NEXT, wait for the ack, delay; returns events sent"""
+    sent = 0
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        sim.press("NEXT")
+        sent += 1
+        time.sleep(LOOP_DELAY)
+    return sent
+
+
+def run(coalesce):
+    sim = ESP32Simulator()
+    receiver = start_receiver(sim.port, coalesce=coalesce)
+    try:
+        sent = 0
+        for _ in range(CLICKS):
+            sent += button_down(sim, CLICK_LENGTH)
+            time.sleep(0.3)
+        clicks_injected = len(receiver.keys.presses)
+        sent += button_down(sim, HOLD)
+        time.sleep(0.2)
+        stats = receiver.remote.gate.stats() if receiver.remote.gate else None
+        return sent, clicks_injected, len(receiver.keys.presses) - clicks_injected, stats
+    finally:
+        stop_receiver(receiver)
+        sim.close()
+
+
+if __name__ == "__main__":
+    print(f"{CLICKS} clicks of {CLICK_LENGTH * 1000:.0f} ms, then held for {HOLD:g} s")
+    for coalesce in (False, True):
+        sent, clicks, held, stats = run(coalesce)
+        print(f"coalescing {'on ' if coalesce else 'off'}: {sent} NEXTs received, "
+              f"{clicks} slides advanced by the clicks, {held} while held")
+        if stats:
+            print(f"  {stats['duplicates']} duplicates dropped, {stats['coalesced']} coalesced, "
+                  f"{stats['repeats']} auto-repeats")
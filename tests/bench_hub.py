@@ -0,0 +1,87 @@
+# Scaling of the hub (hub.py): 1, 10 and 100 simulated remotes served by one
+# event loop, every remote pressing at a steady rate. Reports time to connect
+# all remotes, ack round trip across all presses, and CPU time of the hub's
+# loop and executor threads per press.
+#
+#   python tests/bench_hub.py [seconds] [presses/s per remote]
+
+import asyncio
+import statistics
+import sys
+import threading
+import time
+
+from esp32_sim import ESP32Simulator
+
+import event_log
+from hub import Hub
+
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+RATE = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+SIZES = (1, 10, 100)
+
+
+def thread_cpu(native_id):
+    with open(f"/proc/self/task/{native_id}/schedstat") as f:
+        return int(f.read().split()[0]) / 1e9
+
+
+def presser(sim, rtts, stop_at):
+    next_press = time.perf_counter() + sim.random.uniform(0, 1 / RATE)  # spread the remotes out
+    while next_press < stop_at:
+        time.sleep(max(0, next_press - time.perf_counter()))
+        _, rtt = sim.press("NEXT")
+        rtts.append(rtt)
+        next_press += sim.jitter(1 / RATE)
+
+
+def run(count):
+    sims = [ESP32Simulator(seed=index) for index in range(count)]
+    hub = Hub(backend="recording", arbitration=False)
+    for index, sim in enumerate(sims):
+        hub.add_remote(f"remote-{index + 1}", sim.port, commands_file=None, coalesce=False)
+
+    loop_thread = threading.Thread(target=asyncio.run, args=(hub.run(),), name="hub", daemon=True)
+    start = time.perf_counter()
+    loop_thread.start()
+    while not (hub.keys and all(remote.connected for remote in hub.remotes)):
+        time.sleep(0.001)
+    while sum(sim.pings for sim in sims) < count:
+        time.sleep(0.001)
+    connect_time = time.perf_counter() - start
+
+    threads = (loop_thread.native_id, hub.executor.thread.native_id)
+    cpu_before = sum(thread_cpu(tid) for tid in threads)
+    rtts = []
+    stop_at = time.perf_counter() + DURATION
+    pressers = [threading.Thread(target=presser, args=(sim, rtts, stop_at)) for sim in sims]
+    for thread in pressers:
+        thread.start()
+    for thread in pressers:
+        thread.join()
+    time.sleep(0.1)
+    cpu = sum(thread_cpu(tid) for tid in threads) - cpu_before
+
+    injected = len(hub.keys.presses)
+    hub.loop.call_soon_threadsafe(hub.stop)
+    loop_thread.join(5)
+    hub.close()
+    for sim in sims:
+        sim.close()
+
+    answered = sorted(rtt * 1000 for rtt in rtts if rtt is not None)
+    return connect_time, answered, len(rtts) - len(answered), injected, cpu
+
+
+if __name__ == "__main__":
+    event_log.LOG_FILE = None
+    event_log.LOG_CONSOLE = False
+    event_log.start_logging()
+    print(f"each remote presses NEXT {RATE:g} times/s for {DURATION:g} s")
+    for count in SIZES:
+        connect_time, rtts, missed, injected, cpu = run(count)
+        p99 = rtts[min(len(rtts) - 1, int(len(rtts) * 0.99))]
+        print(f"{count:4} remotes: all connected in {connect_time * 1000:6.1f} ms, {injected / DURATION:6.0f} presses/s, "
+              f"ack p50 {statistics.median(rtts):6.3f} ms p99 {p99:6.3f} ms, {missed} missed, "
+              f"{cpu / max(injected, 1) * 1e6:5.0f} us hub CPU per press")
+    event_log.stop_logging()
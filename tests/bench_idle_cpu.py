@@ -0,0 +1,79 @@
+# CPU time and wakeups of an idle receiver, threaded (main.py) against
+# asyncio (async_receiver.py), each connected to the simulated ESP32 with no
+# button presses: first with the remote awake, then after it sent SLEEP. CPU
+# is read from /proc after startup has settled, so only the idle loops (and
+# any keepalive pings that fall into the window) count. Linux only.
+#
+#   python tests/bench_idle_cpu.py [idle seconds]
+
+import glob
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from esp32_sim import ESP32Simulator
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+IDLE = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+SETTLE = 2.0  # seconds for imports, handshake and backend loading
+ENTRY_POINTS = ("main.py", "async_receiver.py")
+
+
+def per_thread(pid, read):
+    total = 0
+    for task in glob.glob(f"/proc/{pid}/task/*"):
+        try:
+            total += read(task)
+        except (FileNotFoundError, ProcessLookupError):
+            pass  # thread exited meanwhile
+    return total
+
+
+def cpu_seconds(pid):
+    """CPU time summed over all threads, from schedstat's nanosecond run time"""
+    return per_thread(pid, lambda task: int(open(f"{task}/schedstat").read().split()[0])) / 1e9
+
+
+def wakeups(pid):
+    """Context switches summed over all threads; each one is a thread waking up or being preempted"""
+    return per_thread(pid, lambda task: sum(int(line.split()[-1]) for line in open(f"{task}/status")
+                                            if "ctxt_switches" in line))
+
+
+def measure(entry_point, asleep=False):
+    sim = ESP32Simulator()
+    env = dict(os.environ, NEXER_PORT=sim.port, NEXER_INPUT_BACKEND="null",
+               NEXER_TELEMETRY="none")  # its writer wakes once per batch of events, not while idle
+    with tempfile.TemporaryDirectory() as directory:
+        receiver = subprocess.Popen([sys.executable, os.path.join(ROOT, entry_point)], cwd=directory, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            time.sleep(SETTLE)
+            if asleep:
+                sim.send("SLEEP")  # what checkSleep() sends before esp_deep_sleep_start()
+                time.sleep(0.5)
+            cpu, switches, threads = cpu_seconds(receiver.pid), wakeups(receiver.pid), len(os.listdir(f"/proc/{receiver.pid}/task"))
+            time.sleep(IDLE)
+            cpu = cpu_seconds(receiver.pid) - cpu
+            switches = wakeups(receiver.pid) - switches
+        finally:
+            receiver.send_signal(signal.SIGINT)
+            try:
+                receiver.wait(5)
+            except subprocess.TimeoutExpired:
+                receiver.kill()
+            sim.close()
+    return cpu, switches, threads, sim.pings
+
+
+if __name__ == "__main__":
+    print(f"idle for {IDLE:g} s after {SETTLE:g} s of startup")
+    for entry_point in ENTRY_POINTS:
+        for asleep in (False, True):
+            cpu, switches, threads, pings = measure(entry_point, asleep)
+            print(f"{entry_point:>18} {'asleep' if asleep else 'awake':>6}: "
+                  f"{cpu * 3600 / IDLE * 1000:7.0f} ms CPU per idle hour, "
+                  f"{switches / IDLE:6.2f} wakeups/s, {threads} threads, {pings} pings")
@@ -0,0 +1,38 @@
+# Reports the per-press cost of every key injection backend that can be
+# created on this machine. Presses "shift" by default so no slides move.
+#
+#   python tests/bench_input_backends.py [presses] [key]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from input_backends import BACKENDS
+
+PRESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+KEY = sys.argv[2] if len(sys.argv) > 2 else "shift"
+
+
+def bench(name):
+    try:
+        backend = BACKENDS[name]()
+    except Exception as e:
+        print(f"{name:>10}: unavailable ({str(e)})")
+        return
+
+    try:
+        backend.press(KEY)  # warm up lazy setup
+        start = time.perf_counter()
+        for _ in range(PRESSES):
+            backend.press(KEY)
+        elapsed = time.perf_counter() - start
+    finally:
+        backend.close()
+
+    print(f"{name:>10}: {elapsed / PRESSES * 1e6:10.1f} us/press over {PRESSES} presses")
+
+
+if __name__ == "__main__":
+    for name in BACKENDS:
+        bench(name)
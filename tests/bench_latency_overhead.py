@@ -0,0 +1,44 @@
+# Cost of the latency instrumentation per command: the perf_counter_ns()
+# stamps plus the six histogram records one NEXT goes through.
+#
+#   python tests/bench_latency_overhead.py [commands]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import latency
+
+COMMANDS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+
+def instrumented():
+    received = time.perf_counter_ns()
+    framed = time.perf_counter_ns()
+    latency.record("frame", received, framed)
+    latency.record("dispatch", framed)
+    queued = time.perf_counter_ns()
+    latency.record("ack", received)
+    started = time.perf_counter_ns()
+    finished = time.perf_counter_ns()
+    latency.record("queue", queued, started)
+    latency.record("press", started, finished)
+    latency.record("total", received)
+
+
+def bare():
+    pass
+
+
+def per_call(function):
+    start = time.perf_counter()
+    for _ in range(COMMANDS):
+        function()
+    return (time.perf_counter() - start) / COMMANDS * 1e6
+
+
+if __name__ == "__main__":
+    overhead = per_call(instrumented) - per_call(bare)
+    print(f"instrumentation: {overhead:.2f} us per command over {COMMANDS} commands")
+    print("\n".join(latency.report()))
@@ -0,0 +1,77 @@
+# Throughput and memory of log_analytics.py over a large synthetic log: a
+# fleet's worth of talks with presses, keepalives, drops and reconnects.
+#
+#   python tests/bench_log_analytics.py [megabytes]
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import log_analytics
+
+SIZE_MB = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+
+def write_log(path, size):
+    """Receiver runs of connect, presses and keepalives, with a drop and reconnect now and then"""
+    rng = random.Random(1)
+    now = time.mktime((2025, 1, 1, 9, 0, 0, 0, 0, -1))
+    battery = 100.0
+    with open(path, "w") as f:
+        def log(message):
+            f.write(f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))}] {message}\n")
+
+        while f.tell() < size:
+            log("DIY Presentation Remote Receiver Starting")
+            log("Attempting to connect to /dev/rfcomm0")
+            log("Connected to ESP32 via /dev/rfcomm0")
+            log("Communication verified with ESP32 (text protocol)")
+            for _ in range(rng.randint(200, 2000)):
+                now += rng.expovariate(1 / 20)
+                roll = rng.random()
+                if roll < 0.9:
+                    log(f"Received command: '{'NEXT' if rng.random() < 0.9 else 'PREV'}'")
+                elif roll < 0.98:
+                    battery = max(0.0, battery - 0.05)
+                    log("Sent keepalive ping")
+                    log(f"ESP32 Battery Level: {battery:.2f}%")
+                else:
+                    log("Error reading from serial: device reports readiness to read but returned no data")
+                    for _ in range(rng.randint(0, 3)):
+                        now += 1
+                        log("Connection error: could not open port /dev/rfcomm0")
+                    now += rng.uniform(0.5, 5)
+                    log("Connected to ESP32 via /dev/rfcomm0")
+                    if rng.random() < 0.1:
+                        log("No handshake response received")
+                    else:
+                        log("Communication verified with ESP32 (text protocol)")
+            log("Program exited")
+            now += 3600 * rng.uniform(1, 48)
+            battery = 100.0
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "fleet.log")
+        write_log(path, SIZE_MB * 1e6)
+        size = os.path.getsize(path)
+
+        stats = log_analytics.LogStats()
+        started = time.perf_counter()
+        stats.read(path)
+        elapsed = time.perf_counter() - started
+        print(f"{size / 1e6:.0f} MB, {stats.lines} lines in {elapsed:.2f} s: "
+              f"{size / 1e6 / elapsed:.0f} MB/s, {stats.lines / elapsed / 1e6:.2f} M lines/s")
+
+        # Again under tracemalloc, which slows it down too much to time
+        tracemalloc.start()
+        log_analytics.LogStats().read(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"peak {peak / 1024:.0f} KiB traced, whatever the size of the log")
+        print(log_analytics.format_table(stats.summary()))
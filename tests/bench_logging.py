@@ -0,0 +1,51 @@
+# Per-event cost of log_event on the calling thread: the old synchronous
+# print, the queued writer at INFO, and a disabled DEBUG call. Output goes
+# to a temporary file and /dev/null so the terminal does not skew numbers.
+#
+#   python tests/bench_logging.py [events]
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import event_log
+from event_log import DEBUG, log_event
+
+EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+
+def old_log_event(message):
+    """log_event as it was: format the timestamp and print on the caller's thread"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_message = f"[{timestamp}] {message}"
+    print(log_message)
+
+
+def per_event(call):
+    start = time.perf_counter()
+    for index in range(EVENTS):
+        call(index)
+    return (time.perf_counter() - start) / EVENTS * 1e6
+
+
+if __name__ == "__main__":
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            results["old print"] = per_event(lambda i: old_log_event(f"Received command: 'NEXT' {i}"))
+
+            event_log.start_logging(os.path.join(directory, "bench.log"))
+            results["queued INFO"] = per_event(lambda i: log_event("Received command: '%s' %d", "NEXT", i))
+            results["DEBUG off"] = per_event(lambda i: log_event("Sent OK acknowledgment for %s", "NEXT", level=DEBUG))
+
+            start = time.perf_counter()
+            event_log.stop_logging()
+            drain = time.perf_counter() - start
+
+    for name, cost in results.items():
+        print(f"{name:>12}: {cost:6.2f} us/event")
+    print(f"writer drained the backlog {drain * 1000:.0f} ms after the last INFO event")
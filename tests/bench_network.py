@@ -0,0 +1,118 @@
+# Ack round trip of a press over the three ways a remote can reach the
+# asyncio receiver: the simulated serial port, a TCP connection and a
+# WebSocket, all on localhost and all served by the same event loop.
+#
+#   python tests/bench_network.py [presses]
+
+import asyncio
+import base64
+import os
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+
+from esp32_sim import ESP32Simulator
+
+import event_log
+import network
+from async_receiver import AsyncReceiver
+
+PRESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TcpClient:
+    """A Wi-Fi remote: NEXT lines over one long-lived TCP connection"""
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def press(self):
+        self.sock.sendall(b"NEXT\r\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            reply += self.sock.recv(64)
+        return reply.strip() == b"OK"
+
+
+class WebSocketClient(TcpClient):
+    """A phone: NEXT as masked WebSocket text messages"""
+
+    def __init__(self, port):
+        super().__init__(port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((f"GET /remote HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nUpgrade: websocket\r\n"
+                           f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        response = b""
+        while b"\r\n\r\n" not in response:
+            response += self.sock.recv(1024)
+        if b" 101 " not in response.split(b"\r\n", 1)[0]:
+            raise RuntimeError(f"Upgrade refused: {response!r}")
+        self.mask = os.urandom(4)
+        self.message = struct.pack(">BB", 0x81, 0x80 | 4) + self.mask + network.unmask(b"NEXT", self.mask)
+
+    def press(self):
+        self.sock.sendall(self.message)
+        header = self.sock.recv(2, socket.MSG_WAITALL)
+        reply = self.sock.recv(header[1] & 0x7F, socket.MSG_WAITALL)
+        return reply == b"OK"
+
+
+def measure(press):
+    rtts = []
+    for _ in range(PRESSES):
+        start = time.perf_counter()
+        if press():
+            rtts.append((time.perf_counter() - start) * 1000)
+    return rtts
+
+
+if __name__ == "__main__":
+    event_log.LOG_FILE = None
+    event_log.LOG_CONSOLE = False
+    event_log.start_logging()
+
+    network.TCP_PORT = free_port()
+    network.WEBSOCKET_PORT = free_port()
+    sim = ESP32Simulator()
+    receiver = AsyncReceiver(backend="recording")
+    receiver.add_remote(spec=sim.port, coalesce=False)
+    network.COALESCE_REPEATS = False
+
+    thread = threading.Thread(target=asyncio.run, args=(receiver.run(),), daemon=True)
+    thread.start()
+    while not (receiver.connected and receiver.keys and sim.pings):
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    results = {"serial (pty)": measure(lambda: sim.press("NEXT")[1] is not None)}
+    for name, client in (("tcp", TcpClient), ("websocket", WebSocketClient)):
+        for _ in range(50):
+            try:
+                connection = client(getattr(network, "TCP_PORT" if name == "tcp" else "WEBSOCKET_PORT"))
+                break
+            except ConnectionRefusedError:
+                time.sleep(0.01)
+        results[name] = measure(connection.press)
+        connection.sock.close()
+
+    print(f"{PRESSES} presses each, ack round trip:")
+    for name, rtts in results.items():
+        rtts.sort()
+        print(f"{name:>13}: p50 {statistics.median(rtts):6.3f} ms  p99 {rtts[int(len(rtts) * 0.99)]:6.3f} ms  "
+              f"{PRESSES - len(rtts)} missed")
+
+    receiver.loop.call_soon_threadsafe(receiver.stop)
+    thread.join(5)
+    receiver.close()
+    sim.close()
+    event_log.stop_logging()
@@ -0,0 +1,79 @@
+# What profiling costs while it runs: ack round trips of back-to-back presses
+# against the simulated ESP32 with profiling off, then after SIGUSR2 turned
+# it on, for each receiver and profiler mode. Also checks that the files it
+# writes load. Linux only.
+#
+#   python tests/bench_profiler.py [presses]
+
+import glob
+import os
+import pstats
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from esp32_sim import ESP32Simulator
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PRESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+STARTUP_TIMEOUT = 10.0  # seconds
+RUNS = (("main.py", "sample"), ("async_receiver.py", "sample"), ("async_receiver.py", "cprofile"))
+
+
+def round_trips(sim):
+    rtts = []
+    for _ in range(PRESSES):
+        _, rtt = sim.press("NEXT")
+        if rtt is not None:
+            rtts.append(rtt * 1000)
+    rtts.sort()
+    return rtts
+
+
+def describe(rtts):
+    return (f"p50 {statistics.median(rtts):6.3f} ms  p99 {rtts[int(len(rtts) * 0.99)]:6.3f} ms  "
+            f"{PRESSES - len(rtts)} missed")
+
+
+def measure(entry_point, mode):
+    sim = ESP32Simulator()
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, NEXER_PORT=sim.port, NEXER_INPUT_BACKEND="null", NEXER_TELEMETRY="none",
+                   NEXER_PROFILE_MODE=mode, NEXER_PROFILE_SECONDS="600", NEXER_PROFILE_DIR=directory)
+        receiver = subprocess.Popen([sys.executable, os.path.join(ROOT, entry_point)], cwd=directory, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while sim.press("NEXT")[1] is None and time.monotonic() < deadline:
+                pass
+            off = round_trips(sim)
+            receiver.send_signal(signal.SIGUSR2)
+            time.sleep(0.2)
+            on = round_trips(sim)
+            receiver.send_signal(signal.SIGUSR2)  # ends the profile and writes it
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while not glob.glob(os.path.join(directory, "*.pstats")) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.2)
+            files = sorted(os.path.basename(path) for path in glob.glob(os.path.join(directory, "profile-*")))
+            stats = pstats.Stats(glob.glob(os.path.join(directory, "*.pstats"))[0])
+        finally:
+            receiver.send_signal(signal.SIGINT)
+            try:
+                receiver.wait(5)
+            except subprocess.TimeoutExpired:
+                receiver.kill()
+            sim.close()
+    return off, on, files, len(stats.stats)
+
+
+if __name__ == "__main__":
+    print(f"{PRESSES} presses each, acked one at a time")
+    for entry_point, mode in RUNS:
+        off, on, files, functions = measure(entry_point, mode)
+        print(f"{entry_point:>18} {mode:>8}: off {describe(off)}")
+        print(f"{'':>28}on  {describe(on)}")
+        print(f"{'':>28}wrote {', '.join(files)} ({functions} functions)")
@@ -0,0 +1,55 @@
+# Text line protocol against the framed binary protocol on the simulated
+# ESP32: presses per second and ack round trip when each press waits for its
+# ack (what the text firmware does) and with a window of presses in flight,
+# plus bytes on the wire per press.
+#
+#   python tests/bench_protocols.py [presses] [window]
+
+import statistics
+import sys
+import time
+
+from esp32_sim import ESP32Simulator, start_receiver, stop_receiver
+
+PRESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+WINDOW = int(sys.argv[2]) if len(sys.argv) > 2 else 8  # the binary protocol's WINDOW
+
+
+def run(sim, receiver, window):
+    """PRESSES NEXTs with up to window unacknowledged; (presses/s, median ack round trip in ms, bytes per press)"""
+    keys = receiver.keys
+    first = len(keys.presses)
+    base = sim.acked
+    sent_bytes, received_bytes = sim.bytes_sent, sim.bytes_received
+    sent_at = []
+    start = time.perf_counter()
+    for index in range(PRESSES):
+        if index >= window and not sim.wait_acks(base + index - window + 1):
+            break
+        sent_at.append(sim.press("NEXT", wait_ack=False)[0])
+    sim.wait_acks(base + len(sent_at), timeout=5)
+    elapsed = time.perf_counter() - start
+
+    deadline = time.monotonic() + 5
+    while len(keys.presses) - first < len(sent_at) and time.monotonic() < deadline:
+        time.sleep(0.001)
+    rtts = [(acked - sent) * 1000 for sent, acked in zip(sent_at, sim.ack_times[base:])]
+    wire = (sim.bytes_sent - sent_bytes + sim.bytes_received - received_bytes) / max(len(sent_at), 1)
+    return (sim.acked - base) / elapsed, statistics.median(rtts) if rtts else float("nan"), wire
+
+
+if __name__ == "__main__":
+    print(f"{PRESSES} presses per run")
+    for binary in (False, True):
+        sim = ESP32Simulator(binary=binary)
+        receiver = start_receiver(sim.port)
+        try:
+            time.sleep(0.1)  # handshake, which is when the receiver notices the binary protocol
+            name = "binary" if receiver.remote.link.binary else "text"
+            for window in (1, WINDOW):
+                rate, rtt, wire = run(sim, receiver, window)
+                print(f"{name:>6}, {window} in flight: {rate:8,.0f} presses/s  ack round trip p50 {rtt:6.3f} ms  "
+                      f"{wire:4.1f} bytes/press")
+        finally:
+            stop_receiver(receiver)
+            sim.close()
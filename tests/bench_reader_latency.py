@@ -0,0 +1,79 @@
+# Measures byte-arrival-to-dispatch latency of the old polling loop against
+# the event-driven LineReader, using a pty as a stand-in for the ESP32.
+#
+#   python tests/bench_reader_latency.py [presses]
+
+import os
+import pty
+import statistics
+import sys
+import threading
+import time
+
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from serial_reader import LineReader
+
+PRESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+PRESS_GAP = 0.037  # seconds, deliberately not a multiple of the poll interval
+
+
+def poll_loop(port, on_command, stop):
+    """The receive loop main() used before: in_waiting check plus a 100 ms sleep"""
+    while not stop.is_set():
+        if port.in_waiting:
+            command = port.readline().decode('utf-8').strip()
+            if command:
+                on_command(command)
+        time.sleep(0.1)
+
+
+def event_loop(port, on_command, stop):
+    """The current receive loop: block on the fd until a frame is complete"""
+    reader = LineReader(port, timeout=0.2)
+    while not stop.is_set():
+        frame = reader.read_frame()
+        if frame:
+            on_command(frame[0])
+
+
+def run(loop):
+    master, slave = pty.openpty()
+    port = serial.Serial(os.ttyname(slave), 115200, timeout=1)
+    sent = []
+    latencies = []
+    done = threading.Semaphore(0)
+    stop = threading.Event()
+
+    def on_command(command):
+        latencies.append(time.perf_counter() - sent[len(latencies)])
+        done.release()
+
+    worker = threading.Thread(target=loop, args=(port, on_command, stop), daemon=True)
+    worker.start()
+
+    for _ in range(PRESSES):
+        sent.append(time.perf_counter())
+        os.write(master, b"NEXT\r\n")
+        done.acquire(timeout=2)
+        time.sleep(PRESS_GAP)
+
+    stop.set()
+    worker.join()
+    port.close()
+    os.close(master)
+    os.close(slave)
+    return latencies
+
+
+def report(name, latencies):
+    ms = sorted(l * 1000 for l in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{name:>6}: n={len(ms)} mean={statistics.mean(ms):7.3f} ms "
+          f"p50={statistics.median(ms):7.3f} ms p99={p99:7.3f} ms max={ms[-1]:7.3f} ms")
+
+
+if __name__ == "__main__":
+    report("poll", run(poll_loop))
+    report("event", run(event_loop))
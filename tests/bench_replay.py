@@ -0,0 +1,90 @@
+# Record a simulated session with NEXER_CAPTURE, replay it into the async
+# receiver at 1x, 10x and full speed, then replay a long synthetic capture to
+# show that replay memory does not grow with the capture.
+#
+#   python tests/bench_replay.py [presses] [long capture presses]
+
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from esp32_sim import ESP32Simulator, start_receiver, stop_receiver
+
+import capture
+
+PRESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+LONG_PRESSES = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+PRESS_INTERVAL = 0.02  # seconds between presses while recording
+RECEIVER = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "async_receiver.py")]
+
+
+def record(path):
+    """Drive the threaded receiver from the simulator with capturing on"""
+    capture.CAPTURE_FILE = path
+    sim = ESP32Simulator()
+    receiver = start_receiver(sim.port)
+    try:
+        for _ in range(PRESSES):
+            sim.press("NEXT")
+            time.sleep(PRESS_INTERVAL)
+    finally:
+        stop_receiver(receiver)
+        sim.close()
+        capture.CAPTURE_FILE = None
+
+
+def synthesize(path, presses, interval=2.0):
+    """A capture of a long talk: a press every interval seconds, acked after 0.2 ms"""
+    with open(path, "wb") as f:
+        f.write(capture.MAGIC)
+        f.write(capture.RECORD.pack(capture.START, 0, 8) + struct.pack("<d", time.time()))
+        f.write(capture.RECORD.pack(capture.WRITE, 1_000_000, 5) + b"PING\n")
+        f.write(capture.RECORD.pack(capture.READ, 2_000_000, 6) + b"PONG\r\n")
+        for index in range(presses):
+            ns = int((index + 1) * interval * 1e9)
+            f.write(capture.RECORD.pack(capture.READ, ns, 6) + b"NEXT\r\n")
+            f.write(capture.RECORD.pack(capture.WRITE, ns + 200_000, 3) + b"OK\n")
+
+
+def replay(path, speed):
+    session = capture.Replay(path, speed)
+    env = dict(os.environ, NEXER_PORT=session.port, NEXER_INPUT_BACKEND="null", NEXER_TELEMETRY="none")
+    env.pop("NEXER_CAPTURE", None)
+    receiver = subprocess.Popen(RECEIVER, env=env, stdout=subprocess.DEVNULL, cwd=tempfile.gettempdir())
+    try:
+        tracemalloc.start()
+        elapsed = session.run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        receiver.terminate()
+        receiver.wait(5)
+        session.close()
+    return session, elapsed, peak
+
+
+def report(label, path, speed):
+    session, elapsed, peak = replay(path, speed)
+    match = "matches" if session.diverged_at is None else f"differs from byte {session.diverged_at}"
+    print(f"{label:>12}: {elapsed:7.2f} s  {session.records / elapsed:9.0f} records/s  "
+          f"output {match}, {session.sync_timeouts} sync timeouts, peak {peak / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.nexcap")
+        record(path)
+        print(f"Recorded {PRESSES} presses, {os.path.getsize(path)} bytes, "
+              f"{capture.capture_duration(path):.2f} s of traffic")
+        for label, speed in (("1x", 1.0), ("10x", 10.0), ("full speed", None)):
+            report(label, path, speed)
+
+        long_path = os.path.join(directory, "long.nexcap")
+        synthesize(long_path, LONG_PRESSES)
+        print(f"Synthetic talk of {capture.capture_duration(long_path) / 3600:.1f} h, "
+              f"{os.path.getsize(long_path) / 1e6:.1f} MB")
+        report("full speed", long_path, None)
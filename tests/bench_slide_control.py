@@ -0,0 +1,121 @@
+# Slide changes driven over the control channel (HttpSlideBackend against
+# tests/mock_slideshow.py) against keystroke injection: first per backend
+# call, then end to end from a button press on the simulated ESP32 until the
+# slide changes (or the last key is injected), for NEXT and for GOTO:20.
+#
+#   python tests/bench_slide_control.py [presses]
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from esp32_sim import ESP32Simulator, start_receiver, stop_receiver
+from mock_slideshow import MockSlideshow
+
+import input_backends
+from input_backends import BACKENDS, HttpSlideBackend
+
+PRESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+JUMP = 20  # slides for the GOTO comparison
+KEYSTROKE_BACKENDS = ("uinput", "xtest", "xdotool", "pyautogui", "recording")
+
+
+def describe(seconds):
+    us = sorted(value * 1e6 for value in seconds)
+    return f"p50 {statistics.median(us):8.1f} us  p99 {us[min(len(us) - 1, int(len(us) * 0.99))]:8.1f} us"
+
+
+def timed(function, count=PRESSES):
+    times = []
+    for _ in range(count):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def per_call():
+    print("Per backend call:")
+    show = MockSlideshow(slides=JUMP * 2)
+    slides = HttpSlideBackend(show.url)
+    try:
+        print(f"{'http next':>18}: {describe(timed(lambda: slides.press('right')))}")
+        print(f"{'http goto ' + str(JUMP):>18}: {describe(timed(lambda: slides.goto(JUMP)))}  (1 request)")
+        print(f"{'http current':>18}: {describe(timed(slides.current))}")
+    finally:
+        slides.close()
+        show.close()
+
+    for name in KEYSTROKE_BACKENDS:
+        try:
+            keys = BACKENDS[name]()
+        except Exception as e:
+            print(f"{name:>18}: unavailable ({str(e)})")
+            continue
+        try:
+            press = timed(lambda: keys.press("shift"))  # moves no slides; a jump costs JUMP of these (home, then rights)
+            print(f"{name + ' press':>18}: {describe(press)}")
+            print(f"{name + ' goto ' + str(JUMP):>18}: ~{statistics.median(press) * JUMP * 1e6:.1f} us "
+                  f"({JUMP} presses)")
+        finally:
+            keys.close()
+
+
+def end_to_end(backend, show=None):
+    """Press-to-slide-change times for NEXT and GOTO:JUMP through main.py"""
+    sim = ESP32Simulator()
+    receiver = start_receiver(sim.port, backend=backend)
+    try:
+        def changes():
+            return len(show.changes) if show else len(receiver.keys.presses)
+
+        def wait(count, timeout=2):
+            deadline = time.monotonic() + timeout
+            while changes() < count and time.monotonic() < deadline:
+                time.sleep(0.0002)
+            return (show.changes if show else receiver.keys.presses)[count - 1][1] if changes() >= count else None
+
+        def one(command, steps):
+            first = changes()
+            sent_at, _ = sim.press(command)
+            done = wait(first + steps)
+            return done - sent_at if done else None
+
+        results = {}
+        for command, steps in (("NEXT", 1), (f"GOTO:{JUMP}", 1 if show else JUMP)):
+            times = []
+            for _ in range(PRESSES // 3):
+                if show:
+                    show.show(0)
+                elapsed = one(command, steps)
+                if elapsed is not None:
+                    times.append(elapsed)
+            results[command] = times
+        return results
+    finally:
+        stop_receiver(receiver)
+        sim.close()
+
+
+if __name__ == "__main__":
+    per_call()
+
+    import main
+    with tempfile.TemporaryDirectory() as directory:
+        main.COMMANDS_FILE = os.path.join(directory, "commands.json")
+        with open(main.COMMANDS_FILE, "w") as f:
+            json.dump({"GOTO": {"action": "goto", "arg": "int", "ack": True}}, f)
+
+        print("Button press to slide change, through main.py:")
+        show = MockSlideshow(slides=JUMP * 2)
+        input_backends.SLIDE_URL = show.url
+        try:
+            for command, times in end_to_end("http", show).items():
+                print(f"{'http ' + command:>18}: {describe(times)}")
+        finally:
+            show.close()
+        for command, times in end_to_end("recording").items():
+            print(f"{'recording ' + command:>18}: {describe(times)}  (to the last key injected)")
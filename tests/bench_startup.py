@@ -0,0 +1,93 @@
+# Startup cost of the receiver: import time of main.py (python -X importtime)
+# and, with a pty standing in for the ESP32, how long a fresh `python main.py`
+# takes to open the port, ack its first NEXT and have the key backend loaded.
+#
+#   python tests/bench_startup.py [runs] [input backend]
+
+import os
+import pty
+import select
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+BACKEND = sys.argv[2] if len(sys.argv) > 2 else "null"
+
+
+def import_time():
+    """Cumulative import time of main in ms, plus its slowest direct imports"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip())
+        rows.append((int(cumulative) / 1000, depth, name.strip()))
+    total, depth = next((ms, depth) for ms, depth, name in rows if name == "main")
+    direct = [(ms, name) for ms, row_depth, name in rows if row_depth == depth + 2]
+    return total, sorted(direct, reverse=True)[:5]
+
+
+def first_command():
+    """Spawn the receiver on a pty; seconds until PING seen, OK received, backend loaded"""
+    master, slave = pty.openpty()
+    env = dict(os.environ, NEXER_PORT=os.ttyname(slave), NEXER_INPUT_BACKEND=BACKEND, PYTHONUNBUFFERED="1")
+    timings = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        receiver = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py")], cwd=directory, env=env,
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        received = b""
+        output = b""
+        deadline = start + 30
+        while len(timings) < 3 and time.perf_counter() < deadline:
+            readable, _, _ = select.select([master, receiver.stdout], [], [], 1)
+            now = time.perf_counter() - start
+            if master in readable:
+                received += os.read(master, 1024)
+                if b"PING" in received and "port open" not in timings:
+                    timings["port open"] = now
+                    os.write(master, b"PONG\r\nNEXT\r\n")
+                if b"OK" in received and "first ack" not in timings:
+                    timings["first ack"] = now
+            if receiver.stdout in readable:
+                output += os.read(receiver.stdout.fileno(), 4096)
+                if b"key injection backend" in output and "backend ready" not in timings:
+                    timings["backend ready"] = now
+
+        receiver.send_signal(signal.SIGINT)
+        try:
+            receiver.wait(5)
+        except subprocess.TimeoutExpired:
+            receiver.kill()
+
+    os.close(master)
+    os.close(slave)
+    return timings
+
+
+if __name__ == "__main__":
+    totals = []
+    for _ in range(RUNS):
+        total, slowest = import_time()
+        totals.append(total)
+    print(f"import main: median {statistics.median(totals):.1f} ms over {RUNS} runs")
+    for ms, name in slowest:
+        print(f"    {ms:7.1f} ms  {name}")
+
+    runs = [first_command() for _ in range(RUNS)]
+    print(f"python main.py with the {BACKEND} backend, median over {RUNS} runs:")
+    for stage in ("port open", "first ack", "backend ready"):
+        values = [run[stage] * 1000 for run in runs if stage in run]
+        if values:
+            print(f"    {stage:>13}: {statistics.median(values):7.1f} ms")
+        else:
+            print(f"    {stage:>13}: not reached")
@@ -0,0 +1,83 @@
+# What recording an event costs on the command path: the ring buffer with
+# its batched SQLite writer against writing each event to SQLite straight
+# away, then how long the talks/battery queries take over a year of talks.
+#
+#   python tests/bench_telemetry.py [events]
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import telemetry
+
+EVENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+TALKS = 250  # talks in the synthetic year
+PRESSES_PER_TALK = 120
+
+
+def ring(path, events, rate=None):
+    """Record events back to back, or paced at rate per second; returns ns per record() call"""
+    store = telemetry.TelemetryStore(path)
+    store.start()
+    spent = 0
+    for index in range(events):
+        started = time.perf_counter_ns()
+        store.record(telemetry.COMMAND, "NEXT")
+        spent += time.perf_counter_ns() - started
+        if rate:
+            time.sleep(1 / rate)
+    store.stop()
+    return spent / events, store.written, store.dropped
+
+
+def direct(path, events):
+    connection = sqlite3.connect(path)
+    connection.executescript(telemetry.SCHEMA)
+    started = time.perf_counter_ns()
+    for _ in range(events):
+        with connection:
+            connection.execute("INSERT INTO events VALUES (?, ?, ?, ?)",
+                               (time.time(), "command", "NEXT", 0.0))
+    elapsed = time.perf_counter_ns() - started
+    connection.close()
+    return elapsed / events
+
+
+def synthesize(path):
+    """A year of talks: an hour each, a press every 30 s, battery every 30 s draining 10% an hour"""
+    connection = sqlite3.connect(path)
+    connection.executescript(telemetry.SCHEMA)
+    rows = []
+    start = time.time() - 365 * 86400
+    for talk in range(TALKS):
+        begin = start + talk * 86400
+        for press in range(PRESSES_PER_TALK):
+            when = begin + press * 30
+            rows.append((when, "command", "NEXT" if press % 10 else "PREV", 0.0))
+            rows.append((when + 1, "battery", None, 100.0 - press * 30 / 3600 * 10))
+    with connection:
+        connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", rows)
+    return connection
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        per_event, written, dropped = ring(os.path.join(directory, "flood.db"), EVENTS)
+        print(f"ring, flood: {per_event:8.0f} ns per event, {written} written, {dropped} dropped")
+        _, written, dropped = ring(os.path.join(directory, "paced.db"), 2000, rate=1000)
+        print(f" ring, 1k/s: {written} written, {dropped} dropped")
+        events = min(EVENTS, 2000)
+        per_event = direct(os.path.join(directory, "direct.db"), events)
+        print(f"     direct: {per_event:8.0f} ns per event ({events} events, a commit each)")
+
+        connection = synthesize(os.path.join(directory, "year.db"))
+        for name, query in (("talks", telemetry.talks), ("battery", telemetry.battery)):
+            started = time.perf_counter()
+            result = query(connection)
+            print(f"{name:>11}: {(time.perf_counter() - started) * 1000:6.1f} ms over {TALKS} talks")
+        print(f"             {telemetry.battery(connection)['percent_per_hour']}% battery per hour, "
+              f"{telemetry.talks(connection)[0]['per_minute']} presses per minute")
+        connection.close()
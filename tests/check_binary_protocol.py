@@ -0,0 +1,98 @@
+# Checks of the binary protocol's pure parts: the CRC-8, frames decoded by
+# the LineFramer and resynced after damage, and the AckWindow's cumulative
+# ACKs across the seq wrap at 255. Exit status 1 if any check fails.
+#
+#   python tests/check_binary_protocol.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from binary_protocol import ACK, AckWindow, crc8, encode_command, encode_frame
+from checks import check, report
+from framer import LineFramer
+
+
+def frames(framer, data):
+    """Feed data, collecting (frame, seq) for every frame that completes"""
+    framer.feed(data)
+    found = []
+    frame = framer.next_frame()
+    while frame is not None:
+        found.append((frame, framer.seq))
+        frame = framer.next_frame()
+    return found
+
+
+def main():
+    # CRC-8/SMBUS: polynomial 0x07, init 0, no reflection, no final xor
+    check("crc8 empty", crc8(b""), 0x00)
+    check("crc8 check value", crc8(b"123456789"), 0xF4)
+    frame = encode_frame(0x01, 7)
+    check("crc8 over type..payload", frame[-1], crc8(frame[1:-1]))
+    check("crc8 of a whole frame", crc8(frame[1:]), 0x00)
+
+    check("button frame", frames(LineFramer(), encode_command("NEXT", 7)), [(("NEXT", None), 7)])
+    check("payload frame", frames(LineFramer(), encode_frame(0x07, 0, b"87.5")), [(("BATTERY", "87.5"), 0)])
+    check("text frame", frames(LineFramer(), encode_command("BATTERY:50", 3)), [(("BATTERY", "50"), 3)])
+    check("seq wraps in the frame", encode_command("PREV", 256)[2], 0)
+
+    framer = LineFramer()
+    whole = encode_command("PREV", 9)
+    check("partial frame held back", frames(framer, whole[:3]), [])
+    check("partial frame completed", frames(framer, whole[3:]), [(("PREV", None), 9)])
+
+    # A frame with a bad CRC is dropped and the next one still comes through
+    damaged = bytearray(encode_command("NEXT", 1))
+    damaged[-1] ^= 0xFF
+    framer = LineFramer()
+    check("resync after bad crc", frames(framer, bytes(damaged) + encode_command("PREV", 2)), [(("PREV", None), 2)])
+    check("bad crc counted", framer.crc_errors, 1)
+    check("bad crc frame is noise", framer.noise, len(damaged))
+
+    # So is line noise before a frame, and a sync byte with an unknown type
+    framer = LineFramer()
+    check("resync after noise", frames(framer, b"\x13\x37" + bytes((0xA5, 0x7F)) + encode_command("SLEEP", 4)),
+          [(("SLEEP", None), 4)])
+    check("noise counted", framer.noise, 4)
+
+    check("text line after frame", frames(LineFramer(), encode_command("PONG") + b"NEXT\r\n"),
+          [(("PONG", None), 0), (("NEXT", None), None)])
+
+    # The first button frame is accepted whatever its seq, but acknowledged
+    # only once it was taken
+    window = AckWindow()
+    check("first frame accepted", window.accept(254), True)
+    check("no ack before advance", window.take_ack(), None)
+    window.advance(254)
+    check("duplicate dropped", window.accept(254), False)
+    check("ack after duplicate", window.take_ack(), encode_frame(ACK, 254))
+
+    # Cumulative ACK across the wrap
+    for seq in (255, 0, 1):
+        check(f"in order {seq}", window.accept(seq), True)
+        window.advance(seq)
+    check("ack across wrap", window.take_ack(), encode_frame(ACK, 1))
+    check("nothing owed", window.take_ack(), None)
+
+    window = AckWindow()
+    window.accept(255)
+    window.advance(255)
+    check("expected wraps to 0", window.expected_seq, 0)
+    check("ack of 255", window.take_ack(), encode_frame(ACK, 255))
+
+    # A gap is dropped and the ACK repeats the last in-order seq
+    check("gap dropped", window.accept(2), False)
+    check("ack repeated after gap", window.take_ack(), encode_frame(ACK, 255))
+    check("out of sequence counted", window.out_of_sequence, 1)
+
+    # A frame accepted but not taken (queue full) is not covered by the ACK
+    check("accepted", window.accept(0), True)
+    check("not taken, not acked", window.take_ack(), encode_frame(ACK, 255))
+    check("resent frame accepted", window.accept(0), True)
+
+    return report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# Checks of the LineFramer on hand-made byte streams: lines split across
+# reads, line endings and padding, an overlong line being dropped and the
+# line after it framed clean. Exit status 1 if any check fails.
+#
+#   python tests/check_framer.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from checks import check, report
+from framer import LineFramer
+
+
+def frames(framer, *reads):
+    """Feed the reads one by one, collecting every frame that completes"""
+    found = []
+    for data in reads:
+        while data:
+            data = data[framer.feed(data):]
+            frame = framer.next_frame()
+            while frame is not None:
+                found.append(frame)
+                frame = framer.next_frame()
+    return found
+
+
+def main():
+    check("whole lines", frames(LineFramer(), b"NEXT\r\nPREV\r\n"), [("NEXT", None), ("PREV", None)])
+    check("line split across reads", frames(LineFramer(), b"NE", b"X", b"T\r", b"\n"), [("NEXT", None)])
+    check("argument split across reads", frames(LineFramer(), b"BATTERY:8", b"7.5\r\n"), [("BATTERY", "87.5")])
+    check("bare newline", frames(LineFramer(), b"SLEEP\n"), [("SLEEP", None)])
+    check("padding and NULs trimmed", frames(LineFramer(), b"\x00\x00 NEXT \t\r\n"), [("NEXT", None)])
+    check("blank lines skipped", frames(LineFramer(), b"\r\n\r\n\x00\nPONG\r\n"), [("PONG", None)])
+    check("unknown line decoded", frames(LineFramer(), b"HELLO\r\n"), [("HELLO", None)])
+
+    framer = LineFramer()
+    check("partial line held back", frames(framer, b"PRE"), [])
+    check("partial line completed", frames(framer, b"V\r\n"), [("PREV", None)])
+
+    # A run longer than max_line is dropped as soon as it is seen, together
+    # with the rest of it up to the newline; the next line frames normally
+    framer = LineFramer(max_line=8)
+    check("overlong line dropped", frames(framer, b"X" * 9), [])
+    check("overlong line noise", framer.noise, 9)
+    check("overlong tail dropped", frames(framer, b"XXXX\r\nNEXT\r\n"), [("NEXT", None)])
+    check("overlong total noise", framer.noise, 15)
+    check("line at max_line kept", frames(LineFramer(max_line=8), b"PREV", b"IOUS\r\n"), [("PREVIOUS", None)])
+
+    # A partial line at the end of a full buffer moves to the front
+    framer = LineFramer(size=16)
+    check("buffer wraps", frames(framer, b"NEXT\r\nPREV\r\nNE", b"XT\r\n"), [("NEXT", None), ("PREV", None), ("NEXT", None)])
+
+    return report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# Checks of the IdleState's transitions: ACTIVE to IDLE to ASLEEP as the
+# quiet time grows, SLEEP and waking on a command, and the keepalive
+# interval stretching while idle up to its ceiling. Quiet time is made by
+# moving last_activity back. Exit status 1 if any check fails.
+#
+#   python tests/check_idle.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from checks import check, report
+from idle import ACTIVE, ASLEEP, IDLE, IDLE_AFTER, IDLE_KEEPALIVE_MAX, SLEEP_AFTER, IdleState
+from receiver import KEEPALIVE_INTERVAL as INTERVAL
+
+
+def quiet_for(idle, seconds):
+    idle.last_activity = time.monotonic() - seconds
+
+
+def main():
+    idle = IdleState(INTERVAL)
+    start = idle.last_activity
+    check("starts active", idle.state(), ACTIVE)
+    check("active just before idle", idle.state(start + IDLE_AFTER - 0.1), ACTIVE)
+    check("idle after IDLE_AFTER", idle.state(start + IDLE_AFTER), IDLE)
+    check("asleep after SLEEP_AFTER", idle.state(start + SLEEP_AFTER), ASLEEP)
+
+    check("command while active", idle.activity(), False)
+    check("keepalive while active", idle.keepalive_due(idle.last_activity + 5), idle.last_activity + 5 + INTERVAL)
+    check("keepalive after the last command", idle.keepalive_due(idle.last_activity - 5), idle.last_activity + INTERVAL)
+
+    # SLEEP puts it to sleep at once and stops the keepalive; a command wakes it
+    idle.sleep()
+    check("asleep on SLEEP", idle.state(), ASLEEP)
+    check("no keepalive while asleep", idle.keepalive_due(0), None)
+    check("command wakes", idle.activity(), True)
+    check("active after waking", idle.state(), ACTIVE)
+
+    quiet_for(idle, SLEEP_AFTER)
+    check("asleep when quiet", idle.state(), ASLEEP)
+    check("no keepalive when quiet", idle.keepalive_due(0), None)
+    check("command wakes from quiet", idle.activity(), True)
+
+    # While idle every keepalive doubles the interval, up to the ceiling
+    quiet_for(idle, IDLE_AFTER)
+    intervals = []
+    for _ in range(8):
+        intervals.append(round(idle.keepalive_due(idle.last_activity) - idle.last_activity))
+        idle.keepalive_sent()
+    check("idle intervals", intervals, [min(INTERVAL * 2 ** pings, IDLE_KEEPALIVE_MAX) for pings in range(8)])
+    check("idle interval ceiling", intervals[-1], IDLE_KEEPALIVE_MAX)
+
+    check("command wakes from idle", idle.activity(), True)
+    check("interval back to normal", round(idle.keepalive_due(idle.last_activity) - idle.last_activity), INTERVAL)
+    idle.keepalive_sent()
+    check("no stretching while active", idle.idle_pings, 0)
+
+    return report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+# Checks of the PressGate's transitions on made-up timestamps: a new press,
+# bounce before the repeat delay, the first repeat, coalescing while the
+# rate is low, every event passing at the top rate, and the step cap.
+# Exit status 1 if any check fails.
+#
+#   python tests/check_press_gate.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from checks import check, report
+from press_gate import PressGate
+
+
+def ms(milliseconds):
+    return milliseconds * 1_000_000
+
+
+def hold(gate, command, start, end, every):
+    """Events for command from start to end ms, one every `every` ms; {time: presses}"""
+    return {at: gate.admit(command, ms(at)) for at in range(start, end + 1, every)}
+
+
+def main():
+    gate = PressGate()
+    check("first press passes", gate.admit("NEXT", ms(0)), 1)
+    check("bounce absorbed", gate.admit("NEXT", ms(30)), 0)
+    check("other command passes", gate.admit("PREV", ms(40)), 1)
+    check("back to the first passes", gate.admit("NEXT", ms(50)), 1)
+    check("after a gap passes", gate.admit("NEXT", ms(200)), 1)
+    check("stats", gate.stats(), {"events": 5, "passed": 4, "duplicates": 1, "coalesced": 0, "repeats": 0})
+
+    # A button held down, the firmware sending every 60 ms
+    gate = PressGate()
+    presses = hold(gate, "NEXT", 0, 6000, 60)
+    check("hold starts with a press", presses[0], 1)
+    check("nothing before the repeat delay", sum(count for at, count in presses.items() if 0 < at < 500), 0)
+    check("first repeat once the delay is over", presses[540], 1)
+    check("low rate coalesces", gate.coalesced > 0, True)
+    top = [count for at, count in presses.items() if at >= 3000]
+    check("every event passes at the top rate", min(top) > 0, True)
+    check("top rate", abs(sum(top) - 20 * 3) <= 1, True)
+    check("repeats add up", gate.repeats, sum(presses.values()) - 1)
+
+    # Events arriving slower than the rate press several times, up to MAX_STEPS
+    gate = PressGate(hold_gap=10)
+    gate.admit("NEXT", ms(0))
+    check("steps capped", gate.admit("NEXT", ms(3000)), gate.max_steps)
+    check("bucket empty after the cap", gate.admit("NEXT", ms(3001)), 0)
+
+    return report()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
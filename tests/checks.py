@@ -0,0 +1,19 @@
+# Shared by the check_*.py scripts: every check runs and prints what it got
+# when it fails, then report() gives one PASS or FAIL and the exit status.
+
+failures = []
+
+
+def check(name, got, expected):
+    if got != expected:
+        failures.append(name)
+        print(f"FAIL {name}: got {got!r}, expected {expected!r}")
+
+
+def report():
+    """Print the outcome; returns the exit status, 1 if any check failed"""
+    if failures:
+        print(f"FAIL: {len(failures)} check(s)")
+        return 1
+    print("PASS")
+    return 0
@@ -0,0 +1,216 @@
+# Stand-in for the ESP32 firmware (nexer_claude_ver1.ino) on a pty, so the
+# receiver can be run and benchmarked without Bluetooth hardware.
+#
+#   python tests/esp32_sim.py [seconds between NEXT presses] [--binary]
+#
+# then run the receiver with NEXER_PORT set to the printed path. Add --binary
+# to speak the framed binary protocol instead of text lines.
+
+import os
+import pty
+import random
+import select
+import sys
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from binary_protocol import FRAME_CODES, encode_command, encode_frame
+from framer import LineFramer
+
+# Configuration
+BATTERY_LEVEL = 87.5  # percent, reported as "BATTERY:87.50" like Serial.println(float)
+ACK_TIMEOUT = 1.0  # seconds, waitForAcknowledgment() gives up after this
+
+
+class ESP32Simulator:
+    """Plays the firmware's side of the serial protocol on the master end of a pty"""
+
+    def __init__(self, reply_delay=0.0, battery=BATTERY_LEVEL, seed=1, binary=False, link=None):
+        # reply_delay mimics readString() sitting out its stream timeout
+        # before PING/BATTERY? are answered; the real firmware takes ~1 s
+        self.reply_delay = reply_delay
+        self.binary = binary
+        self.battery = battery
+        self.random = random.Random(seed)
+
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # no echo or line editing before the receiver opens it
+        self.port = os.ttyname(self.slave)
+        if link:
+            # A fixed name across simulated drops, like the /dev/cu.* node a
+            # Bluetooth remote gets back when it reconnects
+            temporary = f"{link}.tmp"
+            os.symlink(self.port, temporary)
+            os.replace(temporary, link)
+            self.port = link
+
+        self.write_lock = threading.Lock()
+        self.acks = threading.Condition()
+        self.acked = 0
+        self.sent = 0  # presses sent; in binary mode press n has seq n & 0xFF
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.ack_times = []  # perf_counter of every OK received
+        self.pings = 0
+        self.received = []  # every line from the receiver other than OK
+        self.closed = False
+        self.wake_read, self.wake_write = os.pipe()  # close() ends the reader thread's wait through this
+        self.thread = threading.Thread(target=self.run, name="esp32-sim", daemon=True)
+        self.thread.start()
+
+    def write(self, data):
+        with self.write_lock:
+            os.write(self.master, data)
+            self.bytes_sent += len(data)
+
+    def send(self, line):
+        """Serial.println() a line to the receiver; returns when it was written"""
+        sent_at = time.perf_counter()
+        self.write(line.encode() + b"\r\n")
+        return sent_at
+
+    def press(self, command="NEXT", wait_ack=True):
+        """A button press: send the command, then wait for OK like waitForAcknowledgment()
+
+        Returns (sent_at, ack round trip in seconds or None if it timed out).
+        """
+        with self.acks:
+            self.sent += 1
+            expected = self.sent if self.binary else self.acked + 1
+        if self.binary:
+            sent_at = time.perf_counter()
+            self.write(encode_command(command, expected - 1))
+        else:
+            sent_at = self.send(command)
+        if not wait_ack:
+            return sent_at, None
+        with self.acks:
+            if not self.acks.wait_for(lambda: self.acked >= expected, ACK_TIMEOUT):
+                return sent_at, None
+            return sent_at, self.ack_times[expected - 1] - sent_at
+
+    def wait_acks(self, count, timeout=ACK_TIMEOUT):
+        """Wait until count OKs have arrived in total"""
+        with self.acks:
+            return self.acks.wait_for(lambda: self.acked >= count, timeout)
+
+    def jitter(self, seconds, spread=0.2):
+        """A deterministic (seeded) +/- spread variation of seconds"""
+        return seconds * self.random.uniform(1 - spread, 1 + spread)
+
+    def reply(self, name, arg=None):
+        if self.reply_delay:
+            time.sleep(self.reply_delay)
+        if self.binary:
+            # Also answers a text PING, which is how the receiver finds out
+            self.write(encode_frame(FRAME_CODES[name], 0, arg.encode() if arg else b""))
+        else:
+            self.send(name if arg is None else f"{name}:{arg}")
+
+    def acknowledged(self, count):
+        """Record acks up to a total of count presses"""
+        now = time.perf_counter()
+        with self.acks:
+            if count <= self.acked or count > self.sent:
+                return
+            self.ack_times += [now] * (count - self.acked)
+            self.acked = count
+            self.acks.notify_all()
+
+    def handle(self, command, seq):
+        if command == "OK":
+            self.acknowledged(self.acked + 1)
+        elif command == "ACK":
+            # Cumulative: everything up to and including seq
+            self.acknowledged(self.acked + ((seq + 1 - self.acked) & 0xFF))
+        elif command == "PING":
+            self.pings += 1
+            self.reply("PONG")
+        elif command == "BATTERY?":
+            self.reply("BATTERY", f"{self.battery:.2f}")
+        else:
+            self.received.append(command)
+
+    def run(self):
+        framer = LineFramer(commands={b"OK": "OK", b"PING": "PING", b"BATTERY?": "BATTERY?"}, arg_commands={})
+        while not self.closed:
+            readable, _, _ = select.select([self.master, self.wake_read], [], [])
+            if self.wake_read in readable:
+                return
+            try:
+                self.bytes_received += framer.read_from(self.master)
+            except (OSError, ConnectionError):
+                return
+            while True:
+                frame = framer.next_frame()
+                if not frame:
+                    break
+                self.handle(frame[0], framer.seq)
+
+    def close(self):
+        """Hang up: the receiver sees the port go away once the reader thread has let go of it"""
+        self.closed = True
+        os.write(self.wake_write, b"\0")
+        if self.thread is not threading.current_thread():
+            self.thread.join(1)
+        for fd in (self.master, self.slave, self.wake_read, self.wake_write):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def start_receiver(port, backend="recording", timeout=10, coalesce=False):
+    """Run main.main() on a thread against port, logging nowhere; returns its ThreadedReceiver once it is ready
+
+    Held-button coalescing is off by default: benchmarks send back-to-back
+    presses that are meant to be injected one by one.
+    """
+    import event_log
+    import main
+    import telemetry
+
+    event_log.LOG_FILE = None
+    event_log.LOG_CONSOLE = False
+    telemetry.TELEMETRY_FILE = None
+    main.SERIAL_PORT = port
+    main.INPUT_BACKEND = backend
+    main.COALESCE_REPEATS = coalesce
+    main.receiver = None  # left over if main() already ran in this process
+
+    thread = threading.Thread(target=main.main, name="receiver", daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while not (main.receiver and main.receiver.connected and main.receiver.keys) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    receiver = main.receiver
+    if not (receiver and receiver.connected and receiver.keys):
+        raise RuntimeError(f"Receiver did not come up on {port}")
+    receiver.thread = thread
+    return receiver
+
+
+def stop_receiver(receiver):
+    receiver.stop()
+    receiver.thread.join(5)
+
+
+if __name__ == "__main__":
+    binary = "--binary" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--binary"]
+    interval = float(args[0]) if args else 0
+    sim = ESP32Simulator(reply_delay=1.0, binary=binary)
+    print(f"Simulated ESP32 on {sim.port}")
+    print(f"  NEXER_PORT={sim.port} python main.py")
+    try:
+        while True:
+            if interval:
+                time.sleep(interval)
+                sent_at, rtt = sim.press("NEXT")
+                print(f"NEXT acked in {rtt * 1000:.1f} ms" if rtt is not None else "NEXT: no acknowledgment")
+            else:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        sim.close()
@@ -0,0 +1,111 @@
+# Stand-in for a presentation app's HTTP control port (the protocol
+# HttpSlideBackend in input_backends.py speaks), so slide control can be run
+# and benchmarked headless.
+#
+#   python tests/mock_slideshow.py [slides] [port]
+#
+# then run the receiver with NEXER_INPUT_BACKEND=http and NEXER_SLIDE_URL set
+# to the printed URL.
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configuration
+SLIDES = 40
+PORT = 0  # any free port
+
+
+class MockSlideshow:
+    """A slideshow of count slides that remembers when each change happened"""
+
+    def __init__(self, slides=SLIDES, port=PORT):
+        self.slides = slides
+        self.slide = 0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.changes = []  # (slide index, perf_counter) for every change
+        show = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like a real viewer's control port
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def do_GET(self):
+                if self.path != "/slide":
+                    self.send_error(404)
+                    return
+                self.answer(show.state())
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                if self.path == "/next":
+                    self.answer(show.step(1))
+                elif self.path == "/prev":
+                    self.answer(show.step(-1))
+                elif self.path == "/slide" and isinstance(body.get("slide"), int):
+                    self.answer(show.show(body["slide"]))
+                else:
+                    self.send_error(400)
+
+            def answer(self, state):
+                data = json.dumps(state).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-slideshow", daemon=True)
+        self.thread.start()
+
+    def state(self):
+        with self.lock:
+            self.requests += 1
+            return {"slide": self.slide, "count": self.slides}
+
+    def changed(self, slide):
+        """Caller holds the lock"""
+        self.requests += 1
+        if slide != self.slide:
+            self.slide = slide
+            self.changes.append((slide, time.perf_counter()))
+        return {"slide": self.slide, "count": self.slides}
+
+    def step(self, direction):
+        with self.lock:
+            return self.changed(min(max(self.slide + direction, 0), self.slides - 1))
+
+    def show(self, slide):
+        with self.lock:
+            return self.changed(min(max(slide, 0), self.slides - 1))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    slides = int(sys.argv[1]) if len(sys.argv) > 1 else SLIDES
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8790
+    show = MockSlideshow(slides, port)
+    print(f"Mock slideshow of {slides} slides on {show.url}")
+    print(f"  NEXER_INPUT_BACKEND=http NEXER_SLIDE_URL={show.url} python main.py")
+    try:
+        last = None
+        while True:
+            time.sleep(0.2)
+            if show.slide != last:
+                last = show.slide
+                print(f"Slide {last + 1} of {slides}")
+    except KeyboardInterrupt:
+        show.close()
@@ -0,0 +1,169 @@
+# Soak test: thousands of drop/reconnect cycles against the simulated ESP32,
+# each with a burst of presses, while the receiver's open file descriptors,
+# threads, RSS and traced Python memory are sampled. Fails (exit status 1)
+# if any of them keeps growing, and then prints the allocations that grew.
+# Linux only (/proc, pty).
+#
+#   python tests/soak.py [cycles] [--async]
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from esp32_sim import ESP32Simulator, start_receiver, stop_receiver
+
+import reconnect
+
+CYCLES = int(next((arg for arg in sys.argv[1:] if arg.isdigit()), 2000))
+ASYNC = "--async" in sys.argv
+BURST = 20  # presses per cycle at most
+DROP_MID_BURST = 0.1  # share of cycles where the link drops before the burst is acked
+SAMPLES = 20
+WARMUP = 0.2  # share of the run before growth is measured: caches, histograms and the like fill up first
+CONNECT_TIMEOUT = 10.0  # seconds for the receiver to reconnect and send its PING
+
+# Growth over the measured part of the run that counts as a leak
+LIMITS = {
+    "fds": 2,
+    "threads": 2,
+    "rss_kib": 4096,
+    "traced_kib": 512,
+}
+
+
+def sample():
+    with open("/proc/self/statm") as f:
+        rss_pages = int(f.read().split()[1])
+    return {
+        "fds": len(os.listdir("/proc/self/fd")),
+        "threads": threading.active_count(),
+        "rss_kib": rss_pages * os.sysconf("SC_PAGE_SIZE") // 1024,
+        "traced_kib": tracemalloc.get_traced_memory()[0] // 1024,
+    }
+
+
+def growth(points):
+    """Least-squares slope over (cycle, value) points times the cycles they span"""
+    count = len(points)
+    mean_x = sum(x for x, _ in points) / count
+    mean_y = sum(y for _, y in points) / count
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+    return slope * (points[-1][0] - points[0][0])
+
+
+class ThreadedReceiver:
+    def __init__(self, link):
+        self.receiver = start_receiver(link, backend="null")
+
+    def stop(self):
+        stop_receiver(self.receiver)
+
+
+class AsyncReceiverThread:
+    def __init__(self, link):
+        import async_receiver
+        import event_log
+
+        event_log.LOG_FILE = None
+        event_log.LOG_CONSOLE = False
+        event_log.start_logging()
+        self.receiver = async_receiver.AsyncReceiver("null")
+        self.receiver.add_remote(spec=link, coalesce=False)
+        self.thread = threading.Thread(target=asyncio.run, args=(self.receiver.run(),), name="receiver",
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.receiver.loop.call_soon_threadsafe(self.receiver.stop)
+        self.thread.join(5)
+        self.receiver.close()
+
+
+def cycle(link, rng):
+    """Bring the remote up, press a burst, drop the link; False if the receiver did not reconnect"""
+    sim = ESP32Simulator(link=link)
+    try:
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while not sim.pings and time.monotonic() < deadline:
+            time.sleep(0.005)
+        if not sim.pings:
+            return False
+        presses = rng.randint(1, BURST)
+        for _ in range(presses):
+            sim.press("NEXT", wait_ack=False)
+        if rng.random() >= DROP_MID_BURST:
+            sim.wait_acks(presses)
+        return True
+    finally:
+        sim.close()
+        sim.thread.join(1)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    link = os.path.join(directory, "remote")
+    rng = random.Random(1)
+    tracemalloc.start(10)
+
+    # Every cycle's link is short by design; reconnect at once as after a
+    # link that held, rather than backing off as from a flapping peer
+    reconnect.MIN_LINK_LIFETIME = 0
+
+    first = ESP32Simulator(link=link)
+    receiver = AsyncReceiverThread(link) if ASYNC else ThreadedReceiver(link)
+    first.close()
+
+    interval = max(1, CYCLES // SAMPLES)
+    samples = []
+    baseline = None
+    failed_cycles = 0
+    started = time.monotonic()
+    print(f"{'cycle':>6} {'fds':>5} {'threads':>8} {'rss KiB':>9} {'traced KiB':>11}")
+    try:
+        for index in range(1, CYCLES + 1):
+            if not cycle(link, rng):
+                failed_cycles += 1
+            if index % interval == 0:
+                time.sleep(0.05)  # let the receiver finish handling the last drop
+                values = sample()
+                samples.append((index, values))
+                print(f"{index:>6} {values['fds']:>5} {values['threads']:>8} {values['rss_kib']:>9} "
+                      f"{values['traced_kib']:>11}")
+                if baseline is None and index >= CYCLES * WARMUP:
+                    baseline = tracemalloc.take_snapshot()
+    finally:
+        receiver.stop()
+
+    elapsed = time.monotonic() - started
+    print(f"{CYCLES} cycles in {elapsed:.0f} s ({CYCLES / elapsed:.1f}/s), {failed_cycles} without a reconnect")
+    measured = [(index, values) for index, values in samples if index >= CYCLES * WARMUP]
+    leaks = []
+    for name, limit in LIMITS.items():
+        grown = growth([(index, values[name]) for index, values in measured])
+        print(f"{name:>11}: {grown:+9.1f} over cycles {measured[0][0]}-{measured[-1][0]} (limit {limit})")
+        if grown > limit:
+            leaks.append(name)
+
+    if leaks:
+        print(f"FAIL: {', '.join(leaks)} kept growing")
+        print("Allocations that grew most since warmup:")
+        for stat in tracemalloc.take_snapshot().compare_to(baseline, "traceback")[:10]:
+            print(f"  {stat.size_diff / 1024:+8.1f} KiB {stat.count_diff:+6d} blocks  {stat.traceback[-1]}")
+        return 1
+    if failed_cycles:
+        print("FAIL: the receiver did not always reconnect")
+        return 1
+    print("PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import os
+import serial
+import threading
+
+import metrics
+
+from capture import open_capture
+from commands import COMMANDS_FILE
+from discovery import find_esp32_port, forget_port
+from event_log import log_event
+from framer import ARG_COMMANDS, COMMANDS, LineFramer
+from receiver import BAUD_RATE, COALESCE_REPEATS, Receiver, Remote
+from reconnect import ReconnectManager
+from serial_mux import SerialMux
+
+# Configuration
+LINK_WAIT = None if os.name == "posix" else 1  # seconds; Windows only delivers Ctrl+C to a wait that times out
+
+
+class SerialRemote(Remote):
+    """The one serial remote of the threaded receiver: a reader thread per link and a keepalive thread"""
+
+    def __init__(self, receiver, port=None, commands_file=COMMANDS_FILE, coalesce=True):
+        super().__init__(receiver, commands_file=commands_file, coalesce=coalesce)
+        self.port = port  # None to scan for the ESP32
+        self.serial = None
+        self.reconnects = ReconnectManager(port)
+        self.woken = threading.Event()  # a command after idling, a new connection, or exiting
+
+    def connect(self):
+        """Open the port and start its mux; returns the port, None if there is none to open"""
+        # Close whatever still holds the previous connection, so a day of drops
+        # does not leave a trail of open ports and reader threads behind
+        if self.link:
+            self.link.close()
+        elif self.serial:
+            self.serial.close()
+
+        try:
+            # A probed port comes back already open
+            port, handle = (self.port, None) if self.port else find_esp32_port(BAUD_RATE)
+            if not port:
+                self.log("No suitable port found. Please check your device connection.")
+                return None
+
+            self.log(f"Attempting to connect to {port}")
+            self.reconnects.watch(port)
+            self.from_cache = not self.port and handle is None
+            try:
+                self.serial = handle or serial.Serial(port, BAUD_RATE, timeout=1)
+            except Exception:
+                if not self.port:
+                    forget_port()  # scan again next time
+                raise
+
+            # From here on only the mux reads from the port
+            try:
+                framer = LineFramer(*self.registry.framer_tables(COMMANDS, ARG_COMMANDS))
+                self.link = SerialMux(self.serial, self.handle_command, framer=framer, capture=self.capture)
+                self.link.start()
+            except Exception:
+                self.serial.close()
+                raise
+            return port
+
+        except Exception as e:
+            self.log(f"Connection error: {str(e)}")
+            return None
+
+    def verify(self):
+        """Send initial message to check connection"""
+        try:
+            self.link.request("PING", "PONG")
+            self.verified()
+        except (TimeoutError, ConnectionError) as e:
+            self.handshake_failed(e)
+
+    def keepalive_thread(self):
+        """Thread to periodically check connection and send keepalive signals"""
+        while not self.receiver.exiting:
+            # Sleep until the next keepalive is due; while the remote is asleep or
+            # disconnected there is none, and only woken ends the wait
+            if self.woken.wait(self.keepalive_wait()):
+                self.woken.clear()
+                continue
+            if not self.keepalive_start():
+                continue
+
+            link = self.link
+            try:
+                # Send a ping to check if the connection is still alive
+                link.request("PING", "PONG")
+                self.receiver.log_executor_stats()
+
+                # Check battery level periodically; the firmware only answers
+                # one request per read, so this waits for the PONG first
+                self.battery(link.request("BATTERY?", "BATTERY"))
+            except Exception as e:
+                self.keepalive_failed(link, e)
+
+
+class ThreadedReceiver(Receiver):
+    """The receiver as threads: serial reader, keepalive and key executor, around a loop that reconnects"""
+
+    def __init__(self, port=None, backend=None, commands_file=COMMANDS_FILE, coalesce=COALESCE_REPEATS):
+        super().__init__(backend)
+        self.exiting = False
+        self.remote = SerialRemote(self, port, commands_file, coalesce)
+        self.remotes.append(self.remote)
+
+    def stop(self):
+        """Make run() return; callable from any thread"""
+        self.exiting = True
+        self.remote.woken.set()
+        if self.remote.link:
+            self.remote.link.close()
+
+    def run(self):
+        """Connect, wait for the link to drop, reconnect, until stop()"""
+        remote = self.remote
+
+        # Raw bytes of the session for replay (capture.py), only if NEXER_CAPTURE is set
+        remote.capture = open_capture()
+
+        # Health metrics for Prometheus, only if a port is configured
+        if metrics.METRICS_PORT:
+            self.register_metrics()
+            try:
+                metrics.start_exporter()
+            except OSError as e:
+                log_event(f"Cannot serve metrics: {str(e)}")
+
+        threading.Thread(target=remote.keepalive_thread, name="keepalive", daemon=True).start()
+
+        try:
+            while not self.exiting:
+                # Key presses run on their own thread so reading and acking never
+                # wait on them. The thread starts after the first connection
+                # attempt and loads the key backend (pyautogui pulls in Pillow &
+                # co.) there; presses arriving meanwhile wait in the queue.
+                port = remote.connect()
+                self.executor.start()
+                if not port:
+                    # Wait before trying again
+                    remote.reconnects.wait()
+                    continue
+                remote.connected_via(port)
+                remote.verify()
+
+                # The mux reader thread handles commands; just wait for the link
+                # dropping (or stop() closing it), no polling
+                while not remote.link.closed.wait(LINK_WAIT):
+                    pass
+                held = remote.disconnected(port)
+                remote.link.close()
+                if not held and not self.exiting:
+                    remote.reconnects.wait()
+
+        except KeyboardInterrupt:
+            log_event("Program terminated by user")
+        finally:
+            self.exiting = True
+            self.close()
+
+    def close(self):
+        super().close()
+        metrics.stop_exporter()
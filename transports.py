@@ -0,0 +1,149 @@
+import asyncio
+import socket
+
+from event_log import log_event
+
+# Configuration
+CONNECT_TIMEOUT = 10.0  # seconds for a TCP or RFCOMM connect
+RFCOMM_CHANNEL = 1  # the ESP32's BluetoothSerial SPP channel
+
+
+class Transport:
+    """A byte stream to the remote; fd is what the event loop watches for incoming data"""
+
+    name = "transport"
+
+    def __init__(self):
+        self.fd = None
+
+    async def open(self):
+        raise NotImplementedError
+
+    def write(self, data):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def __str__(self):
+        return self.name
+
+
+class SerialTransport(Transport):
+    """A pyserial port; the path is found by probing (discovery.py) when none is given"""
+
+    def __init__(self, path=None, baud_rate=115200, handle=None):
+        super().__init__()
+        self.path = path
+        self.baud_rate = baud_rate
+        self.port = handle
+        self.name = path or "serial"
+        self.cached = False  # the path is discovery's last known port, not yet probed
+
+    async def open(self):
+        if self.port is None and self.path is None:
+            # Probing blocks on several ports at once, so it runs off the loop
+            from discovery import find_esp32_port
+            loop = asyncio.get_running_loop()
+            self.path, self.port = await loop.run_in_executor(None, find_esp32_port, self.baud_rate)
+            if not self.path:
+                raise OSError("No suitable port found. Please check your device connection.")
+            self.name = self.path
+            self.cached = self.port is None
+        if self.port is None:
+            import serial
+            try:
+                self.port = serial.Serial(self.path, self.baud_rate, timeout=0)
+            except Exception:
+                if self.cached:
+                    from discovery import forget_port
+                    forget_port()  # scan again next time
+                raise
+        self.fd = self.port.fileno()
+
+    def write(self, data):
+        self.port.write(data)
+
+    def close(self):
+        if self.port:
+            self.port.close()
+
+
+class SocketTransport(Transport):
+    """Base for stream sockets: connect without blocking the loop, then plain blocking writes"""
+
+    def make_socket(self):
+        raise NotImplementedError
+
+    async def open(self):
+        self.sock = self.make_socket()
+        loop = asyncio.get_running_loop()
+        if isinstance(self.sock, socket.socket):
+            self.sock.setblocking(False)
+            connecting = loop.sock_connect(self.sock, self.address)
+        else:
+            # pybluez sockets only connect blocking
+            connecting = loop.run_in_executor(None, self.sock.connect, self.address)
+        try:
+            await asyncio.wait_for(connecting, CONNECT_TIMEOUT)
+        except BaseException:
+            self.sock.close()
+            raise
+        # Writes are a few bytes and never fill the send buffer; reads only
+        # happen once the loop has seen the fd readable
+        self.sock.setblocking(True)
+        self.fd = self.sock.fileno()
+
+    def write(self, data):
+        self.sock.sendall(data)
+
+    def close(self):
+        if getattr(self, "sock", None):
+            self.sock.close()
+
+
+class TcpTransport(SocketTransport):
+    """The remote's serial stream over TCP, e.g. from a serial-to-network bridge"""
+
+    def __init__(self, host, port):
+        super().__init__()
+        self.address = (host, port)
+        self.name = f"tcp://{host}:{port}"
+
+    def make_socket(self):
+        sock = socket.socket(socket.AF_INET6 if ":" in self.address[0] else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+
+class RfcommTransport(SocketTransport):
+    """A raw Bluetooth RFCOMM socket to the remote, without a serial device node in between"""
+
+    def __init__(self, address, channel=RFCOMM_CHANNEL):
+        super().__init__()
+        self.address = (address, channel)
+        self.name = f"rfcomm://{address}/{channel}"
+
+    def make_socket(self):
+        if hasattr(socket, "AF_BLUETOOTH"):
+            return socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
+
+        # Python builds without AF_BLUETOOTH (macOS, some Windows builds) go through pybluez
+        try:
+            import bluetooth
+        except ImportError:
+            raise OSError("RFCOMM needs AF_BLUETOOTH sockets or pybluez (pip install pybluez)")
+        return bluetooth.BluetoothSocket(bluetooth.RFCOMM)
+
+
+def make_transport(spec, baud_rate):
+    """Transport for a port setting: tcp://host:port, rfcomm://address[/channel], or a serial path"""
+    if spec and spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].rpartition(":")
+        return TcpTransport(host.strip("[]"), int(port))
+    if spec and spec.startswith("rfcomm://"):
+        address, _, channel = spec[len("rfcomm://"):].partition("/")
+        return RfcommTransport(address, int(channel) if channel else RFCOMM_CHANNEL)
+    if spec and "://" in spec:
+        log_event(f"Unknown transport in {spec}, treating it as a serial port")
+    return SerialTransport(spec, baud_rate)